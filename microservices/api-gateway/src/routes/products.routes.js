@@ -7,20 +7,50 @@ const router = express.Router()
 
 const PRODUCT_SERVICE_URL = process.env.PRODUCT_SERVICE_URL || 'http://localhost:8001'
 
+// Conditional GET: revalidate against the product service instead of refetching
+const CONDITIONAL_HEADERS = ['if-none-match', 'if-modified-since']
+const VALIDATOR_HEADERS = ['etag', 'last-modified', 'cache-control']
+
+const conditionalOptions = (req) => {
+  const headers = {}
+  CONDITIONAL_HEADERS.forEach((name) => {
+    if (req.headers[name]) headers[name] = req.headers[name]
+  })
+  return {
+    headers,
+    validateStatus: (status) => (status >= 200 && status < 300) || status === 304
+  }
+}
+
+const sendWithValidators = (res, response) => {
+  VALIDATOR_HEADERS.forEach((name) => {
+    if (response.headers[name]) res.set(name, response.headers[name])
+  })
+  if (response.status === 304) {
+    return res.status(304).end()
+  }
+  res.json(response.data)
+}
+
+// Listing parameters understood by the product service
+const FILTER_PARAMS = ['search', 'category', 'minPrice', 'maxPrice', 'page', 'per_page', 'sort', 'include_total', 'fields']
+
 // Get all products (with optional search)
 router.get('/', apiLimiter, searchLimiter, async (req, res, next) => {
   try {
-    const { search, category, minPrice, maxPrice } = req.query
-    
     const params = new URLSearchParams()
-    if (search) params.append('search', search)
-    if (category) params.append('category', category)
-    if (minPrice) params.append('minPrice', minPrice)
-    if (maxPrice) params.append('maxPrice', maxPrice)
+    FILTER_PARAMS.forEach((name) => {
+      if (req.query[name]) params.append(name, req.query[name])
+    })
+    // An empty cursor selects cursor mode (first page), so it is kept
+    if (typeof req.query.cursor === 'string') params.append('cursor', req.query.cursor)
 
-    const response = await axios.get(`${PRODUCT_SERVICE_URL}/api/products?${params}`)
+    const response = await axios.get(
+      `${PRODUCT_SERVICE_URL}/api/products?${params}`,
+      conditionalOptions(req)
+    )
     
-    res.json(response.data)
+    sendWithValidators(res, response)
   } catch (error) {
     if (error.response) {
       return res.status(error.response.status).json(error.response.data)
@@ -32,8 +62,11 @@ router.get('/', apiLimiter, searchLimiter, async (req, res, next) => {
 // Get product by ID
 router.get('/:id', apiLimiter, async (req, res, next) => {
   try {
-    const response = await axios.get(`${PRODUCT_SERVICE_URL}/api/products/${req.params.id}`)
-    res.json(response.data)
+    const response = await axios.get(
+      `${PRODUCT_SERVICE_URL}/api/products/${req.params.id}`,
+      conditionalOptions(req)
+    )
+    sendWithValidators(res, response)
   } catch (error) {
     if (error.response) {
       return res.status(error.response.status).json(error.response.data)
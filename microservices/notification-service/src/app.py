@@ -1,6 +1,8 @@
 from flask import Flask, jsonify
 from flask_cors import CORS
+from flask_compress import Compress
 from config import config
+from utils.json_provider import init_json
 import os
 
 def create_app(config_name='default'):
@@ -13,6 +15,8 @@ def create_app(config_name='default'):
     
     # Initialize extensions
     CORS(app)
+    Compress(app)
+    init_json(app)
     
     # Health check
     @app.route('/health')
@@ -42,4 +46,4 @@ if __name__ == '__main__':
     
     print("⚠️  Note: This is the web API. To start the consumer, run 'python src/consumer.py'")
     
-    app.run(host='0.0.0.0', port=port, debug=True)
+    app.run(host='0.0.0.0', port=port, debug=app.config['DEBUG'])
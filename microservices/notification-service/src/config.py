@@ -8,19 +8,41 @@ class Config:
     SECRET_KEY = os.getenv('SECRET_KEY', 'dev-secret-key')
     DEBUG = os.getenv('FLASK_ENV') == 'development'
     
+    # JSON encoder for responses: orjson or stdlib (see utils/json_provider.py)
+    JSON_PROVIDER = os.getenv('JSON_PROVIDER', 'orjson')
+    
+    # Response compression (Flask-Compress): brotli or gzip, per Accept-Encoding
+    COMPRESS_REGISTER = os.getenv('COMPRESS_ENABLED', 'true').lower() == 'true'
+    COMPRESS_ALGORITHM = ['br', 'gzip']
+    COMPRESS_MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', 1024))
+    COMPRESS_LEVEL = int(os.getenv('COMPRESS_LEVEL', 6))
+    COMPRESS_BR_LEVEL = int(os.getenv('COMPRESS_BR_LEVEL', 4))
+    
     # RabbitMQ config
     RABBITMQ_HOST = os.getenv('RABBITMQ_HOST', 'localhost')
     RABBITMQ_PORT = int(os.getenv('RABBITMQ_PORT', 5672))
     RABBITMQ_USER = os.getenv('RABBITMQ_USER', 'guest')
     RABBITMQ_PASSWORD = os.getenv('RABBITMQ_PASSWORD', 'guest')
     RABBITMQ_QUEUE = os.getenv('RABBITMQ_QUEUE', 'notifications')
+    COALESCE_WINDOW = float(os.getenv('COALESCE_WINDOW', 10))
+    COALESCE_MAX_PENDING = int(os.getenv('COALESCE_MAX_PENDING', 500))
+    RETRY_DELAYS = [int(delay) for delay in os.getenv('RETRY_DELAYS', '5,30,300').split(',')]
     
-    # Email config (mock for development)
+    # Email config (printed to the console in development)
     SMTP_HOST = os.getenv('SMTP_HOST', 'localhost')
     SMTP_PORT = int(os.getenv('SMTP_PORT', 1025))
     SMTP_USER = os.getenv('SMTP_USER', '')
     SMTP_PASSWORD = os.getenv('SMTP_PASSWORD', '')
     FROM_EMAIL = os.getenv('FROM_EMAIL', 'noreply@redshopping.com')
+    EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', 'console' if os.getenv('FLASK_ENV') == 'development' else 'smtp')
+    SMTP_USE_TLS = os.getenv('SMTP_USE_TLS', 'false').lower() == 'true'
+    SMTP_USE_SSL = os.getenv('SMTP_USE_SSL', 'false').lower() == 'true'
+    SMTP_TIMEOUT = float(os.getenv('SMTP_TIMEOUT', 10))
+    SMTP_POOL_SIZE = int(os.getenv('SMTP_POOL_SIZE', 4))
+    SMTP_MAX_MESSAGES_PER_CONNECTION = int(os.getenv('SMTP_MAX_MESSAGES_PER_CONNECTION', 100))
+    SMTP_IDLE_TIMEOUT = float(os.getenv('SMTP_IDLE_TIMEOUT', 30))
+    SMTP_RATE_LIMIT_PER_DOMAIN = float(os.getenv('SMTP_RATE_LIMIT_PER_DOMAIN', 0))
+    SMTP_RATE_LIMIT_BURST = int(os.getenv('SMTP_RATE_LIMIT_BURST', 0))
 
 class DevelopmentConfig(Config):
     """Development configuration"""
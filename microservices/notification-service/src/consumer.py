@@ -1,91 +1,282 @@
+import functools
 import json
+import multiprocessing
 import os
+import signal
 import sys
-from utils.rabbitmq import get_rabbitmq_connection, declare_queue
+import time
+import pika
+from concurrent.futures import ThreadPoolExecutor
+from utils.rabbitmq import (
+    get_rabbitmq_connection,
+    declare_queue,
+    declare_retry_topology,
+    retry_delays,
+    retry_queue_name,
+    dead_letter_queue_name,
+    attempt_of,
+    ATTEMPT_HEADER,
+    ERROR_HEADER
+)
+from utils.coalescer import EventCoalescer, merge_status_events
 from utils.email_sender import (
     send_order_confirmation,
     send_order_cancelled,
     send_order_status_update
 )
 
-def process_event(ch, method, properties, body):
-    """Process incoming event from RabbitMQ"""
+# Message outcomes, settled back on the connection thread
+ACK = 'ack'
+RETRY = 'retry'   # park in the next delay queue (dead-letter once retries run out)
+DEAD = 'dead'     # straight to the dead-letter queue (poison message)
+
+class DeliveryFailed(Exception):
+    """The email could not be sent; the event is retried later"""
+
+def handle_event(event):
+    """Send the notification for one decoded event"""
+    event_type = event.get('event_type')
+    
+    print(f"📨 Received event: {event_type}")
+    
+    # Handle different event types
+    if event_type == 'order_created':
+        sent = send_order_confirmation(
+            user_email=event.get('user_email'),
+            order_id=event.get('order_id'),
+            total=event.get('total'),
+            items=event.get('items', []),
+            locale=event.get('locale')
+        )
+        if not sent:
+            raise DeliveryFailed(f"Order confirmation for order #{event.get('order_id')} not sent")
+        print(f"✅ Sent order confirmation for order #{event.get('order_id')}")
+    
+    elif event_type == 'order_cancelled':
+        sent = send_order_cancelled(
+            user_email=event.get('user_email'),
+            order_id=event.get('order_id'),
+            total=event.get('total'),
+            locale=event.get('locale')
+        )
+        if not sent:
+            raise DeliveryFailed(f"Order cancellation for order #{event.get('order_id')} not sent")
+        print(f"✅ Sent order cancellation for order #{event.get('order_id')}")
+    
+    elif event_type == 'order_status_updated':
+        sent = send_order_status_update(
+            user_email=event.get('user_email'),
+            order_id=event.get('order_id'),
+            status=event.get('status'),
+            locale=event.get('locale'),
+            history=event.get('status_history')
+        )
+        if not sent:
+            raise DeliveryFailed(f"Status update for order #{event.get('order_id')} not sent")
+        print(f"✅ Sent status update for order #{event.get('order_id')}")
+    
+    else:
+        print(f"⚠️  Unknown event type: {event_type}")
+
+def run_handler(event):
+    """Handle one decoded event and return (outcome, error)"""
+    try:
+        handle_event(event)
+        return ACK, None
+    except Exception as e:
+        print(f"❌ Error processing event: {e}")
+        return RETRY, e
+
+def process_event(body):
+    """Process one message body and return (outcome, error)"""
     try:
         # Parse event
         event = json.loads(body)
-        event_type = event.get('event_type')
-        
-        print(f"📨 Received event: {event_type}")
-        
-        # Handle different event types
-        if event_type == 'order_created':
-            send_order_confirmation(
-                user_email=event.get('user_email'),
-                order_id=event.get('order_id'),
-                total=event.get('total'),
-                items=event.get('items', [])
-            )
-            print(f"✅ Sent order confirmation for order #{event.get('order_id')}")
-        
-        elif event_type == 'order_cancelled':
-            send_order_cancelled(
-                user_email=event.get('user_email'),
-                order_id=event.get('order_id'),
-                total=event.get('total')
-            )
-            print(f"✅ Sent order cancellation for order #{event.get('order_id')}")
-        
-        elif event_type == 'order_status_updated':
-            send_order_status_update(
-                user_email=event.get('user_email'),
-                order_id=event.get('order_id'),
-                status=event.get('status')
-            )
-            print(f"✅ Sent status update for order #{event.get('order_id')}")
-        
-        else:
-            print(f"⚠️  Unknown event type: {event_type}")
-        
-        # Acknowledge message
-        ch.basic_ack(delivery_tag=method.delivery_tag)
-        
     except json.JSONDecodeError as e:
         print(f"❌ Failed to parse event: {e}")
-        ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
-    except Exception as e:
-        print(f"❌ Error processing event: {e}")
-        ch.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
+        return DEAD, e
+    return run_handler(event)
+
+def settle(channel, delivery_tag, outcome, properties=None, body=None, error=None,
+           queue_name=None, delays=()):
+    """Ack a message, or move it to a retry/dead-letter queue (connection thread only)
+    
+    Failed messages are re-published with an incremented attempt header and
+    then acked, so a failure waits in a delay queue instead of being
+    redelivered immediately.
+    """
+    if not channel.is_open:
+        # The broker redelivers unacked messages of a closed channel
+        return
+    if outcome == ACK:
+        channel.basic_ack(delivery_tag=delivery_tag)
+        return
+    
+    attempt = attempt_of(properties)
+    if outcome == RETRY and attempt < len(delays):
+        attempt += 1
+        target = retry_queue_name(queue_name, attempt)
+    else:
+        target = dead_letter_queue_name(queue_name)
+    
+    headers = dict(properties.headers or {})
+    headers[ATTEMPT_HEADER] = attempt
+    headers[ERROR_HEADER] = str(error)[:500]
+    
+    try:
+        channel.basic_publish(
+            exchange='',
+            routing_key=target,
+            body=body,
+            properties=pika.BasicProperties(
+                delivery_mode=2,
+                content_type=properties.content_type,
+                headers=headers
+            )
+        )
+    except (pika.exceptions.UnroutableError, pika.exceptions.NackError) as e:
+        print(f"❌ Could not move message to '{target}': {e}")
+        channel.basic_nack(delivery_tag=delivery_tag, requeue=True)
+        return
+    
+    channel.basic_ack(delivery_tag=delivery_tag)
+    print(f"↪️  Message moved to '{target}' (attempt {attempt})")
+
+def run_consumer(worker_id=0):
+    """Consume with a thread pool; pika objects stay on this thread"""
+    queue_name = os.getenv('RABBITMQ_QUEUE', 'notifications')
+    threads = int(os.getenv('CONSUMER_THREADS', 4))
+    coalesce_window = float(os.getenv('COALESCE_WINDOW', 10))
+    coalesce_max_pending = int(os.getenv('COALESCE_MAX_PENDING', 500))
+    
+    # Buffered status events stay unacked, so they need prefetch room of their own
+    default_prefetch = threads * 2 + (coalesce_max_pending if coalesce_window > 0 else 0)
+    prefetch = int(os.getenv('CONSUMER_PREFETCH', default_prefetch))
+    
+    delays = retry_delays()
+    
+    connection = get_rabbitmq_connection()
+    channel = connection.channel()
+    
+    # Confirm retry/dead-letter publishes before acking the original
+    channel.confirm_delivery()
+    
+    # Declare queue
+    declare_queue(channel, queue_name)
+    declare_retry_topology(channel, queue_name, delays)
+    
+    # Keep enough unacked messages in flight to feed every worker thread
+    channel.basic_qos(prefetch_count=prefetch)
+    
+    executor = ThreadPoolExecutor(
+        max_workers=threads,
+        thread_name_prefix=f'notify-{worker_id}'
+    )
+    
+    def settle_later(delivery_tag, properties, body, outcome, error):
+        connection.add_callback_threadsafe(functools.partial(
+            settle, channel, delivery_tag, outcome,
+            properties=properties, body=body, error=error,
+            queue_name=queue_name, delays=delays
+        ))
+    
+    def work(delivery_tag, properties, body):
+        if coalescer is not None:
+            if coalescer.offer(body, (delivery_tag, properties, body)):
+                # Settled when its group is flushed
+                return
+            # Status events still buffered for this order go out first
+            for group in coalescer.take_order_groups(body):
+                work_group(group)
+        outcome, error = process_event(body)
+        settle_later(delivery_tag, properties, body, outcome, error)
+    
+    def work_group(group):
+        # One email for the whole group; every message shares the outcome
+        group.sort(key=lambda entry: entry[1][0])
+        if len(group) > 1:
+            print(f"🧩 Coalesced {len(group)} status events for order #{group[-1][0].get('order_id')}")
+        outcome, error = run_handler(merge_status_events([event for event, _ in group]))
+        for _, message in group:
+            settle_later(*message, outcome, error)
+    
+    coalescer = None
+    if coalesce_window > 0:
+        coalescer = EventCoalescer(
+            window=coalesce_window,
+            max_pending=coalesce_max_pending,
+            on_flush=lambda group: executor.submit(work_group, group)
+        )
+    
+    def on_message(ch, method, properties, body):
+        executor.submit(work, method.delivery_tag, properties, body)
+    
+    # Start consuming
+    channel.basic_consume(
+        queue=queue_name,
+        on_message_callback=on_message,
+        auto_ack=False
+    )
+    
+    print(f"✅ Consumer {worker_id} ready ({threads} threads, prefetch {prefetch})")
+    
+    try:
+        channel.start_consuming()
+    finally:
+        # Finish in-flight messages and flush their acks before closing
+        if channel.is_open:
+            channel.stop_consuming()
+        if coalescer is not None:
+            coalescer.close()
+        executor.shutdown(wait=True)
+        if connection.is_open:
+            connection.process_data_events(time_limit=1)
+            connection.close()
+
+def _run_worker(worker_id):
+    try:
+        run_consumer(worker_id)
+    except KeyboardInterrupt:
+        pass
 
 def start_consumer():
-    """Start RabbitMQ consumer"""
+    """Start RabbitMQ consumer(s)"""
     queue_name = os.getenv('RABBITMQ_QUEUE', 'notifications')
+    processes = int(os.getenv('CONSUMER_PROCESSES', 1))
     
     print("🚀 Starting Notification Service Consumer")
     print(f"📬 Listening to queue: {queue_name}")
+    print("⏳ Waiting for messages. Press CTRL+C to exit.")
+    
+    # Container stop (SIGTERM) shuts down like CTRL+C
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
     
     try:
-        # Connect to RabbitMQ
-        connection = get_rabbitmq_connection()
-        channel = connection.channel()
-        
-        # Declare queue
-        declare_queue(channel, queue_name)
-        
-        # Set QoS - process one message at a time
-        channel.basic_qos(prefetch_count=1)
-        
-        # Start consuming
-        channel.basic_consume(
-            queue=queue_name,
-            on_message_callback=process_event,
-            auto_ack=False
-        )
-        
-        print("✅ Notification Service is ready")
-        print("⏳ Waiting for messages. Press CTRL+C to exit.")
-        
-        channel.start_consuming()
+        if processes <= 1:
+            run_consumer()
+            return
         
+        # One connection per process so throughput scales with cores;
+        # a worker that dies is restarted
+        workers = {}
+        try:
+            while True:
+                for worker_id in range(processes):
+                    worker = workers.get(worker_id)
+                    if worker is None or not worker.is_alive():
+                        if worker is not None:
+                            print(f"⚠️  Consumer {worker_id} exited ({worker.exitcode}), restarting")
+                        worker = multiprocessing.Process(target=_run_worker, args=(worker_id,))
+                        worker.start()
+                        workers[worker_id] = worker
+                time.sleep(1)
+        finally:
+            for worker in workers.values():
+                if worker.is_alive():
+                    worker.terminate()
+            for worker in workers.values():
+                worker.join()
+    
     except KeyboardInterrupt:
         print("\n⚠️  Consumer interrupted by user")
         sys.exit(0)
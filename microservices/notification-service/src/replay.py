@@ -0,0 +1,80 @@
+"""Move dead-lettered notifications back onto the main queue
+
+    python src/replay.py                # replay everything in notifications.dead
+    python src/replay.py --limit 10     # replay the 10 oldest messages
+    python src/replay.py --dry-run      # list messages without moving them
+"""
+import argparse
+import os
+import sys
+import pika
+from utils.rabbitmq import (
+    get_rabbitmq_connection,
+    dead_letter_queue_name,
+    ATTEMPT_HEADER,
+    ERROR_HEADER
+)
+
+def replay(queue_name, limit=None, dry_run=False):
+    """Re-publish up to `limit` dead-lettered messages with a fresh retry budget"""
+    dead_queue = dead_letter_queue_name(queue_name)
+    
+    connection = get_rabbitmq_connection()
+    channel = connection.channel()
+    channel.confirm_delivery()
+    
+    moved = 0
+    try:
+        while limit is None or moved < limit:
+            method, properties, body = channel.basic_get(queue=dead_queue, auto_ack=False)
+            if method is None:
+                break
+            
+            headers = dict(properties.headers or {})
+            print(f"📨 {body[:120]!r} (attempts: {headers.get(ATTEMPT_HEADER, 0)}, "
+                  f"error: {headers.get(ERROR_HEADER, '-')})")
+            
+            if dry_run:
+                # Leave it where it is; it is redelivered once the channel closes
+                moved += 1
+                continue
+            
+            headers.pop(ATTEMPT_HEADER, None)
+            headers.pop(ERROR_HEADER, None)
+            channel.basic_publish(
+                exchange='',
+                routing_key=queue_name,
+                body=body,
+                properties=pika.BasicProperties(
+                    delivery_mode=2,
+                    content_type=properties.content_type,
+                    headers=headers
+                )
+            )
+            channel.basic_ack(delivery_tag=method.delivery_tag)
+            moved += 1
+    finally:
+        connection.close()
+    
+    return moved
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay dead-lettered notifications')
+    parser.add_argument('--queue', default=os.getenv('RABBITMQ_QUEUE', 'notifications'))
+    parser.add_argument('--limit', type=int, default=None)
+    parser.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args()
+    
+    try:
+        moved = replay(args.queue, limit=args.limit, dry_run=args.dry_run)
+    except Exception as e:
+        print(f"❌ Replay failed: {e}")
+        sys.exit(1)
+    
+    if args.dry_run:
+        print(f"🔍 {moved} message(s) in '{dead_letter_queue_name(args.queue)}'")
+    else:
+        print(f"✅ Replayed {moved} message(s) to '{args.queue}'")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+COALESCED_EVENT_TYPES = ('order_status_updated',)
+
+class EventCoalescer:
+    """Buffer rapid status events per order and hand them over as one group
+    
+    The first event for an (order_id, user_email) opens a window of `window`
+    seconds; every event for the same key that arrives before it closes joins
+    the group. Groups are passed to `on_flush(messages)` from a background
+    thread, oldest first, when their window closes or when more than
+    `max_pending` messages are buffered. The buffered messages stay unacked
+    until the flushed group is settled, so nothing is lost on a crash.
+    """
+    
+    def __init__(self, window, max_pending, on_flush):
+        self.window = window
+        self.max_pending = max_pending
+        self.on_flush = on_flush
+        
+        # key -> (deadline, [(event, message), ...]), in window order
+        self._groups = OrderedDict()
+        self._pending = 0
+        self._closed = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._run, name='coalescer', daemon=True)
+        self._thread.start()
+    
+    def offer(self, body, message):
+        """Buffer the message if it is a coalescable event; return True if taken"""
+        try:
+            event = json.loads(body)
+        except ValueError:
+            return False
+        if not isinstance(event, dict) or event.get('event_type') not in COALESCED_EVENT_TYPES:
+            return False
+        
+        key = (event.get('order_id'), event.get('user_email'))
+        with self._cond:
+            if self._closed:
+                return False
+            if key in self._groups:
+                self._groups[key][1].append((event, message))
+            else:
+                self._groups[key] = (time.monotonic() + self.window, [(event, message)])
+            self._pending += 1
+            if self._pending > self.max_pending:
+                self._cond.notify()
+        return True
+    
+    def take_order_groups(self, body):
+        """Pop the open groups of the order a non-coalesced event is about
+        
+        The caller handles them before that event, so e.g. a buffered
+        "confirmed" is never sent after the order's "cancelled".
+        """
+        try:
+            event = json.loads(body)
+        except ValueError:
+            return []
+        if not isinstance(event, dict) or event.get('order_id') is None:
+            return []
+        
+        order_id = event['order_id']
+        with self._cond:
+            keys = [key for key in self._groups if key[0] == order_id]
+            groups = [self._groups.pop(key)[1] for key in keys]
+            self._pending -= sum(len(group) for group in groups)
+        return groups
+    
+    def _due_groups(self, flush_all=False):
+        """Pop the groups whose window closed (caller holds the lock)"""
+        due = []
+        now = time.monotonic()
+        while self._groups:
+            key, (deadline, group) = next(iter(self._groups.items()))
+            if not (flush_all or deadline <= now or self._pending > self.max_pending):
+                break
+            del self._groups[key]
+            self._pending -= len(group)
+            due.append(group)
+        return due
+    
+    def _run(self):
+        while True:
+            with self._cond:
+                if self._closed:
+                    return
+                due = self._due_groups()
+                if not due:
+                    timeout = self.window
+                    if self._groups:
+                        timeout = max(0, next(iter(self._groups.values()))[0] - time.monotonic())
+                    self._cond.wait(timeout)
+                    continue
+            for group in due:
+                self.on_flush(group)
+    
+    def close(self):
+        """Stop the timer and flush every buffered group now"""
+        with self._cond:
+            self._closed = True
+            due = self._due_groups(flush_all=True)
+            self._cond.notify()
+        self._thread.join()
+        for group in due:
+            self.on_flush(group)
+
+def merge_status_events(events):
+    """Fold a group of status events for one order into a single event
+    
+    The latest event wins; every status it went through is kept in
+    `status_history`, in arrival order.
+    """
+    merged = dict(events[-1])
+    history = []
+    for event in events:
+        for status in event.get('status_history') or [event.get('status')]:
+            if not history or history[-1] != status:
+                history.append(status)
+    merged['status_history'] = history
+    return merged
@@ -1,15 +1,115 @@
 import os
+import smtplib
+import threading
 from datetime import datetime
+from email.message import EmailMessage
+from email.utils import formatdate, make_msgid
+from utils.smtp_pool import SMTPConnectionPool, RateLimiter
+from utils.templates import render
+
+# SMTP delivery state, created lazily per process (consumer workers fork)
+_pool = None
+_limiter = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+
+def _email_backend():
+    """`console` prints emails (development default), `smtp` delivers them"""
+    default = 'console' if os.getenv('FLASK_ENV') == 'development' else 'smtp'
+    return os.getenv('EMAIL_BACKEND', default).lower()
+
+def get_smtp_pool():
+    """Return the per-process SMTP pool and rate limiter"""
+    global _pool, _limiter, _pool_pid
+    if _pool is None or _pool_pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool_pid != os.getpid():
+                _pool = SMTPConnectionPool(
+                    host=os.getenv('SMTP_HOST', 'localhost'),
+                    port=int(os.getenv('SMTP_PORT', 1025)),
+                    user=os.getenv('SMTP_USER', ''),
+                    password=os.getenv('SMTP_PASSWORD', ''),
+                    use_tls=os.getenv('SMTP_USE_TLS', 'false').lower() == 'true',
+                    use_ssl=os.getenv('SMTP_USE_SSL', 'false').lower() == 'true',
+                    timeout=float(os.getenv('SMTP_TIMEOUT', 10)),
+                    max_size=int(os.getenv('SMTP_POOL_SIZE', 4)),
+                    max_messages=int(os.getenv('SMTP_MAX_MESSAGES_PER_CONNECTION', 100)),
+                    idle_timeout=float(os.getenv('SMTP_IDLE_TIMEOUT', 30))
+                )
+                _limiter = RateLimiter(
+                    rate=float(os.getenv('SMTP_RATE_LIMIT_PER_DOMAIN', 0)),
+                    burst=int(os.getenv('SMTP_RATE_LIMIT_BURST', 0)) or None
+                )
+                _pool_pid = os.getpid()
+    return _pool, _limiter
+
+def build_message(to_email, subject, body, html=None):
+    """Plain-text message, multipart/alternative when an HTML body is given"""
+    msg = EmailMessage()
+    msg['Subject'] = subject
+    msg['From'] = os.getenv('FROM_EMAIL', 'noreply@redshopping.com')
+    msg['To'] = to_email
+    msg['Date'] = formatdate(localtime=True)
+    msg['Message-ID'] = make_msgid()
+    msg.set_content(body)
+    if html:
+        msg.add_alternative(html, subtype='html')
+    return msg
+
+def _domain(to_email):
+    return to_email.rsplit('@', 1)[-1].lower()
+
+def _deliver(messages):
+    """Send messages over one pooled session, reconnecting once if it drops
+    
+    Returns the number of messages accepted by the server.
+    """
+    pool, limiter = get_smtp_pool()
+    sent = 0
+    pending = list(messages)
+    reconnected = False
+    
+    while pending:
+        session = pool.acquire()
+        try:
+            while pending:
+                msg = pending[0]
+                limiter.wait(_domain(msg['To']))
+                try:
+                    session.send(msg)
+                    sent += 1
+                except smtplib.SMTPRecipientsRefused as e:
+                    # Permanent for this message, the session is still usable
+                    print(f"❌ SMTP refused message to {msg['To']}: {e}")
+                except smtplib.SMTPResponseException as e:
+                    if e.smtp_code < 500:
+                        raise
+                    print(f"❌ SMTP refused message to {msg['To']}: {e}")
+                pending.pop(0)
+        except (smtplib.SMTPServerDisconnected, smtplib.SMTPResponseException, OSError) as e:
+            pool.release(session, discard=True)
+            if reconnected:
+                print(f"❌ SMTP delivery failed: {e}")
+                break
+            print(f"⚠️  SMTP session lost ({e}), reconnecting")
+            reconnected = True
+            continue
+        except Exception:
+            pool.release(session, discard=True)
+            raise
+        pool.release(session)
+    
+    return sent
 
-def send_email(to_email, subject, body):
+def send_email(to_email, subject, body, html=None):
     """
     Send email notification
     In development, this just logs the email
-    In production, you would use SMTP, SendGrid, AWS SES, etc.
+    Otherwise it is delivered over a pooled SMTP session (see send_emails)
     """
     try:
         # Mock email sending for development
-        if os.getenv('FLASK_ENV') == 'development':
+        if _email_backend() == 'console':
             print("\n" + "="*60)
             print("📧 EMAIL NOTIFICATION")
             print("="*60)
@@ -20,105 +120,43 @@ def send_email(to_email, subject, body):
             print("="*60 + "\n")
             return True
         
-        # Production email sending would go here
-        # Example with SMTP:
-        # import smtplib
-        # from email.mime.text import MIMEText
-        # 
-        # msg = MIMEText(body)
-        # msg['Subject'] = subject
-        # msg['From'] = os.getenv('FROM_EMAIL')
-        # msg['To'] = to_email
-        # 
-        # with smtplib.SMTP(os.getenv('SMTP_HOST'), os.getenv('SMTP_PORT')) as server:
-        #     server.starttls()
-        #     server.login(os.getenv('SMTP_USER'), os.getenv('SMTP_PASSWORD'))
-        #     server.send_message(msg)
-        
-        return True
+        return _deliver([build_message(to_email, subject, body, html)]) == 1
     except Exception as e:
         print(f"❌ Failed to send email: {e}")
         return False
 
-def send_order_confirmation(user_email, order_id, total, items):
-    """Send order confirmation email"""
-    subject = f"Order Confirmation - Order #{order_id}"
+def send_emails(emails):
+    """Send many (to_email, subject, body[, html]) emails over one SMTP session
     
-    items_text = "\n".join([
-        f"- {item['product_name']} x{item['quantity']} - ${item['subtotal']:.2f}"
-        for item in items
-    ])
-    
-    body = f"""
-Dear Customer,
-
-Thank you for your order!
-
-Order Details:
-Order ID: #{order_id}
-Total Amount: ${total:.2f}
-
-Items:
-{items_text}
-
-Your order is being processed and you will receive another email when it ships.
-
-Thank you for shopping with Red Shopping!
-
-Best regards,
-The Red Shopping Team
+    Returns the number of emails delivered.
     """
+    emails = list(emails)
+    if _email_backend() == 'console':
+        return sum(1 for email in emails if send_email(*email))
     
-    return send_email(user_email, subject, body)
-
-def send_order_cancelled(user_email, order_id, total):
-    """Send order cancellation email"""
-    subject = f"Order Cancelled - Order #{order_id}"
-    
-    body = f"""
-Dear Customer,
-
-Your order has been cancelled as requested.
-
-Order Details:
-Order ID: #{order_id}
-Total Amount: ${total:.2f}
+    try:
+        return _deliver([build_message(*email) for email in emails])
+    except Exception as e:
+        print(f"❌ Failed to send emails: {e}")
+        return 0
 
-If you did not request this cancellation, please contact our support team immediately.
+def send_order_confirmation(user_email, order_id, total, items, locale=None):
+    """Send order confirmation email"""
+    email = render('order_confirmation', locale,
+                   order_id=order_id, total=total, items=items)
+    return send_email(user_email, email.subject, email.text, email.html)
 
-Best regards,
-The Red Shopping Team
-    """
-    
-    return send_email(user_email, subject, body)
+def send_order_cancelled(user_email, order_id, total, locale=None):
+    """Send order cancellation email"""
+    email = render('order_cancelled', locale,
+                   order_id=order_id, total=total)
+    return send_email(user_email, email.subject, email.text, email.html)
 
-def send_order_status_update(user_email, order_id, status):
-    """Send order status update email"""
-    subject = f"Order Update - Order #{order_id}"
+def send_order_status_update(user_email, order_id, status, locale=None, history=None):
+    """Send order status update email
     
-    status_messages = {
-        'confirmed': 'Your order has been confirmed and is being prepared.',
-        'shipped': 'Your order has been shipped! It should arrive soon.',
-        'delivered': 'Your order has been delivered. Thank you for shopping with us!',
-        'cancelled': 'Your order has been cancelled.'
-    }
-    
-    message = status_messages.get(status, f'Your order status has been updated to: {status}')
-    
-    body = f"""
-Dear Customer,
-
-Order Status Update:
-
-Order ID: #{order_id}
-New Status: {status.upper()}
-
-{message}
-
-Track your order anytime by logging into your account.
-
-Best regards,
-The Red Shopping Team
+    `history` lists every status of a coalesced group (oldest first).
     """
-    
-    return send_email(user_email, subject, body)
+    email = render('order_status_update', locale,
+                   order_id=order_id, status=status, history=history or [status])
+    return send_email(user_email, email.subject, email.text, email.html)
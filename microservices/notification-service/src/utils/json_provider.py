@@ -0,0 +1,59 @@
+from datetime import date
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional speedup, the stdlib encoder is used without it
+    orjson = None
+
+def _default(obj):
+    # Rows from column-projected queries carry raw datetimes; render them like to_dict()
+    if isinstance(obj, date):
+        return obj.isoformat()
+    return DefaultJSONProvider.default(obj)
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by orjson when it is installed
+    
+    Same output as the default provider (sorted keys, compact unless
+    debugging), except that dates and datetimes are ISO 8601 strings, as
+    produced by the models' to_dict().
+    """
+    
+    default = staticmethod(_default)
+    
+    def __init__(self, app, use_orjson=True):
+        super().__init__(app)
+        self.use_orjson = use_orjson and orjson is not None
+    
+    def _options(self, pretty=False):
+        option = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        return option
+    
+    def dumps(self, obj, **kwargs):
+        if not self.use_orjson or kwargs:
+            # Callers passing stdlib json options get the stdlib encoder
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=_default, option=self._options()).decode('utf-8')
+    
+    def loads(self, s, **kwargs):
+        if not self.use_orjson or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+    
+    def response(self, *args, **kwargs):
+        if not self.use_orjson:
+            return super().response(*args, **kwargs)
+        
+        obj = self._prepare_response_obj(args, kwargs)
+        pretty = self.compact is False or (self.compact is None and self._app.debug)
+        body = orjson.dumps(obj, default=_default, option=self._options(pretty))
+        return self._app.response_class(body + b'\n', mimetype=self.mimetype)
+
+def init_json(app):
+    """Install the JSON provider (JSON_PROVIDER=stdlib skips orjson)"""
+    app.json = FastJSONProvider(app, use_orjson=app.config['JSON_PROVIDER'] == 'orjson')
@@ -26,3 +26,43 @@ def declare_queue(channel, queue_name):
     """Declare queue"""
     channel.queue_declare(queue=queue_name, durable=True)
     print(f"✅ Queue '{queue_name}' declared")
+
+ATTEMPT_HEADER = 'x-attempt'
+ERROR_HEADER = 'x-last-error'
+
+def retry_delays():
+    """Delay (seconds) before each retry; the list length is the retry budget"""
+    delays = os.getenv('RETRY_DELAYS', '5,30,300')
+    return [int(delay) for delay in delays.split(',') if delay.strip()]
+
+def retry_queue_name(queue_name, attempt):
+    return f"{queue_name}.retry.{attempt}"
+
+def dead_letter_queue_name(queue_name):
+    return f"{queue_name}.dead"
+
+def declare_retry_topology(channel, queue_name, delays):
+    """Declare one delay queue per attempt and the final dead-letter queue
+    
+    A message parked in `<queue>.retry.<n>` expires after delays[n-1] seconds
+    and is dead-lettered back to `<queue>` through the default exchange, so
+    the main queue itself keeps its original (argument-less) declaration.
+    """
+    for attempt, delay in enumerate(delays, start=1):
+        channel.queue_declare(
+            queue=retry_queue_name(queue_name, attempt),
+            durable=True,
+            arguments={
+                'x-message-ttl': delay * 1000,
+                'x-dead-letter-exchange': '',
+                'x-dead-letter-routing-key': queue_name
+            }
+        )
+    channel.queue_declare(queue=dead_letter_queue_name(queue_name), durable=True)
+    print(f"✅ Retry queues declared ({', '.join(f'{d}s' for d in delays)}) "
+          f"and dead-letter queue '{dead_letter_queue_name(queue_name)}'")
+
+def attempt_of(properties):
+    """Number of retries a message has already been through"""
+    headers = (properties.headers if properties else None) or {}
+    return int(headers.get(ATTEMPT_HEADER, 0))
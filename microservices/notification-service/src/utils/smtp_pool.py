@@ -0,0 +1,125 @@
+import smtplib
+import threading
+import time
+from collections import deque
+
+class SMTPConnectionPool:
+    """Pool of authenticated SMTP sessions shared by the consumer threads
+    
+    A session is opened (connect, STARTTLS, login) once and reused for many
+    messages. Sessions idle for longer than `idle_timeout` are checked with
+    NOOP before reuse, and recycled after `max_messages` messages.
+    """
+    
+    def __init__(self, host, port, user='', password='', use_tls=False,
+                 use_ssl=False, timeout=10, max_size=4, max_messages=100,
+                 idle_timeout=30):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.use_tls = use_tls
+        self.use_ssl = use_ssl
+        self.timeout = timeout
+        self.max_size = max_size
+        self.max_messages = max_messages
+        self.idle_timeout = idle_timeout
+        
+        self._idle = deque()
+        self._slots = threading.BoundedSemaphore(max_size)
+        self._lock = threading.Lock()
+    
+    def _connect(self):
+        smtp_class = smtplib.SMTP_SSL if self.use_ssl else smtplib.SMTP
+        server = smtp_class(self.host, self.port, timeout=self.timeout)
+        if self.use_tls and not self.use_ssl:
+            server.starttls()
+        if self.user:
+            server.login(self.user, self.password)
+        return _PooledSession(server)
+    
+    def acquire(self):
+        """Borrow a live session, opening one if none is idle"""
+        self._slots.acquire()
+        try:
+            while True:
+                with self._lock:
+                    session = self._idle.pop() if self._idle else None
+                if session is None:
+                    return self._connect()
+                if time.monotonic() - session.last_used < self.idle_timeout or session.is_alive():
+                    return session
+                session.close()
+        except Exception:
+            self._slots.release()
+            raise
+    
+    def release(self, session, discard=False):
+        """Return a session to the pool (or close it when broken/worn out)"""
+        try:
+            if discard or session.sent >= self.max_messages:
+                session.close()
+            else:
+                session.last_used = time.monotonic()
+                with self._lock:
+                    self._idle.append(session)
+        finally:
+            self._slots.release()
+    
+    def close(self):
+        with self._lock:
+            sessions, self._idle = list(self._idle), deque()
+        for session in sessions:
+            session.close()
+
+class _PooledSession:
+    def __init__(self, server):
+        self.server = server
+        self.sent = 0
+        self.last_used = time.monotonic()
+    
+    def send(self, message):
+        refused = self.server.send_message(message)
+        self.sent += 1
+        return refused
+    
+    def is_alive(self):
+        try:
+            return self.server.noop()[0] == 250
+        except OSError:
+            # smtplib.SMTPException is an OSError too
+            return False
+    
+    def close(self):
+        try:
+            self.server.quit()
+        except (smtplib.SMTPException, OSError):
+            self.server.close()
+
+class RateLimiter:
+    """Token bucket per destination domain
+    
+    `rate` messages per second with bursts of up to `burst`; `wait()` blocks
+    the calling thread until the domain has a token. A rate of 0 disables it.
+    """
+    
+    def __init__(self, rate, burst=None):
+        self.rate = rate
+        self.burst = burst or max(1, int(rate))
+        self._buckets = {}
+        self._lock = threading.Lock()
+    
+    def wait(self, key):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                tokens, updated = self._buckets.get(key, (self.burst, now))
+                tokens = min(self.burst, tokens + (now - updated) * self.rate)
+                if tokens >= 1:
+                    self._buckets[key] = (tokens - 1, now)
+                    return
+                self._buckets[key] = (tokens, now)
+                delay = (1 - tokens) / self.rate
+            time.sleep(delay)
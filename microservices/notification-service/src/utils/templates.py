@@ -0,0 +1,64 @@
+import os
+from collections import namedtuple
+from jinja2 import Environment, FileSystemLoader, StrictUndefined, select_autoescape
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'templates', 'emails')
+DEFAULT_LOCALE = os.getenv('DEFAULT_LOCALE', 'en')
+
+# Every email is a subject, a plain-text body and an HTML body
+TEMPLATE_NAMES = ('order_confirmation', 'order_cancelled', 'order_status_update')
+
+RenderedEmail = namedtuple('RenderedEmail', ['subject', 'text', 'html'])
+
+def _money(value):
+    return f"${value:.2f}"
+
+_env = Environment(
+    loader=FileSystemLoader(TEMPLATE_DIR),
+    autoescape=select_autoescape(enabled_extensions=('html',), default_for_string=False),
+    undefined=StrictUndefined,
+    trim_blocks=True,
+    lstrip_blocks=True,
+    # Templates never change at runtime: compile once, never stat the files again
+    auto_reload=False,
+    cache_size=-1
+)
+_env.filters['money'] = _money
+
+# (locale, name) -> (subject, text, html) compiled templates
+_compiled = {}
+
+def load_templates():
+    """Compile every template of every locale (once, at startup)"""
+    _compiled.clear()
+    for locale in sorted(os.listdir(TEMPLATE_DIR)):
+        if not os.path.isdir(os.path.join(TEMPLATE_DIR, locale)):
+            continue
+        for name in TEMPLATE_NAMES:
+            _compiled[(locale, name)] = (
+                _env.get_template(f"{locale}/{name}.subject.txt"),
+                _env.get_template(f"{locale}/{name}.txt"),
+                _env.get_template(f"{locale}/{name}.html")
+            )
+    if (DEFAULT_LOCALE, TEMPLATE_NAMES[0]) not in _compiled:
+        raise RuntimeError(f"No templates for default locale '{DEFAULT_LOCALE}'")
+
+def _resolve(name, locale):
+    # 'fr-CA' -> 'fr' -> default locale
+    if locale:
+        locale = locale.replace('_', '-').lower()
+        templates = _compiled.get((locale, name)) or _compiled.get((locale.split('-')[0], name))
+        if templates:
+            return templates
+    return _compiled[(DEFAULT_LOCALE, name)]
+
+def render(name, locale=None, **context):
+    """Render one email in the requested locale (falls back to DEFAULT_LOCALE)"""
+    subject, text, html = _resolve(name, locale)
+    return RenderedEmail(
+        subject=subject.render(context).strip(),
+        text=text.render(context),
+        html=html.render(context)
+    )
+
+load_templates()
@@ -0,0 +1,52 @@
+"""Gunicorn configuration
+
+Run with: gunicorn -c gunicorn.conf.py
+Every setting can be overridden through environment variables.
+"""
+import multiprocessing
+import os
+
+# Worker model: sync (one request per process), gthread (thread pool per
+# process) or gevent (cooperative greenlets, best for I/O-bound handlers)
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+
+if worker_class == 'gevent':
+    # Patch before the application (and its DB/HTTP clients) is imported
+    from gevent import monkey
+    monkey.patch_all()
+
+def post_fork(server, worker):
+    if worker_class == 'gevent':
+        # psycopg2 is a C driver that monkey-patching does not reach: without
+        # a gevent wait callback every query would block the worker's hub
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+
+cpu_count = multiprocessing.cpu_count()
+default_workers = cpu_count + 1 if worker_class == 'gevent' else cpu_count * 2 + 1
+
+bind = f"0.0.0.0:{os.getenv('PORT', 8003)}"
+wsgi_app = 'wsgi:app'
+chdir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src')
+
+workers = int(os.getenv('WEB_CONCURRENCY', default_workers))
+threads = int(os.getenv('GUNICORN_THREADS', 4)) if worker_class == 'gthread' else 1
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 1000))
+
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+
+# Recycle workers periodically to cap memory growth; jitter avoids
+# every worker restarting at the same moment
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 100))
+
+# Preloading shares the imported application between workers (copy-on-write)
+# but is incompatible with code reloading
+reload = os.getenv('GUNICORN_RELOAD', 'false').lower() == 'true'
+preload_app = not reload and os.getenv('GUNICORN_PRELOAD', 'true').lower() == 'true'
+
+accesslog = os.getenv('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+loglevel = os.getenv('GUNICORN_LOG_LEVEL', 'info')
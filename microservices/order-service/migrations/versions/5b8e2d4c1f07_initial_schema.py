@@ -0,0 +1,57 @@
+"""initial schema
+
+Revision ID: 5b8e2d4c1f07
+Revises: 
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b8e2d4c1f07'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Databases created before migrations existed (db.create_all) already
+    # have these tables; only create what is missing
+    inspector = sa.inspect(op.get_bind())
+
+    if not inspector.has_table('orders'):
+        op.create_table(
+            'orders',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.String(length=100), nullable=False),
+            sa.Column('user_email', sa.String(length=200), nullable=False),
+            sa.Column('items', sa.Text(), nullable=False),
+            sa.Column('total', sa.Float(), nullable=False),
+            sa.Column('status', sa.String(length=50), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+    if not inspector.has_table('order_outbox'):
+        op.create_table(
+            'order_outbox',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('event_type', sa.String(length=50), nullable=False),
+            sa.Column('order_id', sa.Integer(), nullable=True),
+            sa.Column('payload', sa.Text(), nullable=False),
+            sa.Column('attempts', sa.Integer(), nullable=False),
+            sa.Column('last_error', sa.Text(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('published_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_order_outbox_published_at', 'order_outbox', ['published_at'])
+
+
+def downgrade():
+    op.drop_index('ix_order_outbox_published_at', table_name='order_outbox')
+    op.drop_table('order_outbox')
+    op.drop_table('orders')
@@ -0,0 +1,43 @@
+"""order reservation keys and stock release outbox
+
+Revision ID: 6e4a2d8c1b93
+Revises: d43b7a9c2f15
+Create Date: 2026-10-18 10:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6e4a2d8c1b93'
+down_revision = 'd43b7a9c2f15'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('orders') as batch_op:
+        batch_op.add_column(sa.Column('reservation_id', sa.String(length=64), nullable=True))
+
+    op.create_table(
+        'stock_release_outbox',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('order_id', sa.Integer(), nullable=False),
+        sa.Column('reservation_id', sa.String(length=64), nullable=True),
+        sa.Column('payload', sa.Text(), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('released_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_stock_release_outbox_released_at', 'stock_release_outbox', ['released_at'])
+
+
+def downgrade():
+    op.drop_index('ix_stock_release_outbox_released_at', table_name='stock_release_outbox')
+    op.drop_table('stock_release_outbox')
+
+    with op.batch_alter_table('orders') as batch_op:
+        batch_op.drop_column('reservation_id')
@@ -0,0 +1,131 @@
+"""drop orders.items (contract of d43b7a9c2f15)
+
+Run only once no pod of the release before order_items is serving: those
+pods still read and write the JSON column.
+
+Revision ID: 9f3b6c2e8a41
+Revises: 6e4a2d8c1b93
+Create Date: 2026-10-18 10:20:00.000000
+
+"""
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9f3b6c2e8a41'
+down_revision = '6e4a2d8c1b93'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+
+def upgrade():
+    # Orders placed by old pods during the rollout only have the JSON lines
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        op.execute("""
+            INSERT INTO order_items (order_id, product_id, product_name, quantity, price, subtotal)
+            SELECT o.id,
+                   (line.item->>'product_id')::integer,
+                   line.item->>'product_name',
+                   (line.item->>'quantity')::integer,
+                   (line.item->>'price')::double precision,
+                   (line.item->>'subtotal')::double precision
+            FROM orders o
+            CROSS JOIN LATERAL jsonb_array_elements(o.items::jsonb) WITH ORDINALITY AS line(item, position)
+            WHERE o.items IS NOT NULL
+              AND NOT EXISTS (SELECT 1 FROM order_items i WHERE i.order_id = o.id)
+            ORDER BY o.id, line.position
+        """)
+    else:
+        _backfill_in_batches(bind)
+
+    with op.batch_alter_table('orders') as batch_op:
+        batch_op.drop_column('items')
+
+
+def _backfill_in_batches(bind):
+    orders = sa.table('orders', sa.column('id', sa.Integer), sa.column('items', sa.Text))
+    order_items = sa.table(
+        'order_items',
+        sa.column('order_id', sa.Integer),
+        sa.column('product_id', sa.Integer),
+        sa.column('product_name', sa.String),
+        sa.column('quantity', sa.Integer),
+        sa.column('price', sa.Float),
+        sa.column('subtotal', sa.Float)
+    )
+
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(orders.c.id, orders.c['items'])
+            .where(
+                orders.c.id > last_id,
+                orders.c['items'].isnot(None),
+                ~sa.exists().where(order_items.c.order_id == orders.c.id)
+            )
+            .order_by(orders.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        lines = [
+            {
+                'order_id': row.id,
+                'product_id': int(item['product_id']),
+                'product_name': item['product_name'],
+                'quantity': int(item['quantity']),
+                'price': float(item['price']),
+                'subtotal': float(item['subtotal'])
+            }
+            for row in rows
+            for item in json.loads(row.items or '[]')
+        ]
+        if lines:
+            bind.execute(order_items.insert(), lines)
+        last_id = rows[-1].id
+
+
+def downgrade():
+    with op.batch_alter_table('orders') as batch_op:
+        batch_op.add_column(sa.Column('items', sa.Text(), nullable=True))
+
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        op.execute("""
+            UPDATE orders o SET items = COALESCE((
+                SELECT json_agg(json_build_object(
+                    'product_id', i.product_id,
+                    'product_name', i.product_name,
+                    'quantity', i.quantity,
+                    'price', i.price,
+                    'subtotal', i.subtotal
+                ) ORDER BY i.id)::text
+                FROM order_items i
+                WHERE i.order_id = o.id
+            ), '[]')
+        """)
+    else:
+        grouped = {}
+        for row in bind.execute(sa.text(
+            'SELECT order_id, product_id, product_name, quantity, price, subtotal '
+            'FROM order_items ORDER BY id'
+        )):
+            grouped.setdefault(row.order_id, []).append({
+                'product_id': row.product_id,
+                'product_name': row.product_name,
+                'quantity': row.quantity,
+                'price': row.price,
+                'subtotal': row.subtotal
+            })
+        bind.execute(sa.text("UPDATE orders SET items = '[]'"))
+        for order_id, items in grouped.items():
+            bind.execute(
+                sa.text('UPDATE orders SET items = :items WHERE id = :id'),
+                {'items': json.dumps(items), 'id': order_id}
+            )
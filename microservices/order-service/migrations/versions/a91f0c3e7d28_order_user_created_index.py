@@ -0,0 +1,43 @@
+"""orders (user_id, created_at DESC, id DESC) index
+
+Revision ID: a91f0c3e7d28
+Revises: 5b8e2d4c1f07
+Create Date: 2026-10-18 09:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a91f0c3e7d28'
+down_revision = '5b8e2d4c1f07'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Serves the per-user filter and the newest-first sort of get_orders,
+    # get_order, cancel_order and cursor pagination in a single index scan
+    if op.get_bind().dialect.name != 'postgresql':
+        op.create_index(
+            'ix_orders_user_id_created_at', 'orders',
+            ['user_id', sa.text('created_at DESC'), sa.text('id DESC')]
+        )
+        return
+
+    # CONCURRENTLY keeps the table writable while the index builds
+    with op.get_context().autocommit_block():
+        op.execute(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_orders_user_id_created_at '
+            'ON orders (user_id, created_at DESC, id DESC)'
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        op.drop_index('ix_orders_user_id_created_at', table_name='orders')
+        return
+
+    with op.get_context().autocommit_block():
+        op.execute('DROP INDEX CONCURRENTLY IF EXISTS ix_orders_user_id_created_at')
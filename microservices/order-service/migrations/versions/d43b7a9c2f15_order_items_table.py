@@ -0,0 +1,150 @@
+"""normalize orders.items JSON into order_items (expand)
+
+orders.items is kept, nullable, so pods of the previous release keep
+working during the rollout; 9f3b6c2e8a41 drops it in a later release.
+
+Revision ID: d43b7a9c2f15
+Revises: a91f0c3e7d28
+Create Date: 2026-10-18 09:20:00.000000
+
+"""
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd43b7a9c2f15'
+down_revision = 'a91f0c3e7d28'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+
+def upgrade():
+    op.create_table(
+        'order_items',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('order_id', sa.Integer(), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('product_name', sa.String(length=200), nullable=False),
+        sa.Column('quantity', sa.Integer(), nullable=False),
+        sa.Column('price', sa.Float(), nullable=False),
+        sa.Column('subtotal', sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(['order_id'], ['orders.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        # Set-based backfill, keeping the line order of every cart
+        op.execute("""
+            INSERT INTO order_items (order_id, product_id, product_name, quantity, price, subtotal)
+            SELECT o.id,
+                   (line.item->>'product_id')::integer,
+                   line.item->>'product_name',
+                   (line.item->>'quantity')::integer,
+                   (line.item->>'price')::double precision,
+                   (line.item->>'subtotal')::double precision
+            FROM orders o
+            CROSS JOIN LATERAL jsonb_array_elements(o.items::jsonb) WITH ORDINALITY AS line(item, position)
+            ORDER BY o.id, line.position
+        """)
+    else:
+        _backfill_in_batches(bind)
+
+    # Indexes after the backfill: one bulk build instead of per-row maintenance
+    op.create_index('ix_order_items_order_id', 'order_items', ['order_id'])
+    op.create_index('ix_order_items_product_id_order_id', 'order_items', ['product_id', 'order_id'])
+
+    # New code no longer writes the JSON column
+    with op.batch_alter_table('orders') as batch_op:
+        batch_op.alter_column('items', existing_type=sa.Text(), nullable=True)
+
+
+def _backfill_in_batches(bind):
+    orders = sa.table('orders', sa.column('id', sa.Integer), sa.column('items', sa.Text))
+    order_items = sa.table(
+        'order_items',
+        sa.column('order_id', sa.Integer),
+        sa.column('product_id', sa.Integer),
+        sa.column('product_name', sa.String),
+        sa.column('quantity', sa.Integer),
+        sa.column('price', sa.Float),
+        sa.column('subtotal', sa.Float)
+    )
+
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(orders.c.id, orders.c['items'])
+            .where(orders.c.id > last_id)
+            .order_by(orders.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        lines = [
+            {
+                'order_id': row.id,
+                'product_id': int(item['product_id']),
+                'product_name': item['product_name'],
+                'quantity': int(item['quantity']),
+                'price': float(item['price']),
+                'subtotal': float(item['subtotal'])
+            }
+            for row in rows
+            for item in json.loads(row.items or '[]')
+        ]
+        if lines:
+            bind.execute(order_items.insert(), lines)
+        last_id = rows[-1].id
+
+
+def downgrade():
+    # Orders created since the upgrade only have order_items rows
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        op.execute("""
+            UPDATE orders o SET items = COALESCE((
+                SELECT json_agg(json_build_object(
+                    'product_id', i.product_id,
+                    'product_name', i.product_name,
+                    'quantity', i.quantity,
+                    'price', i.price,
+                    'subtotal', i.subtotal
+                ) ORDER BY i.id)::text
+                FROM order_items i
+                WHERE i.order_id = o.id
+            ), '[]')
+            WHERE o.items IS NULL
+        """)
+    else:
+        grouped = {}
+        for row in bind.execute(sa.text(
+            'SELECT i.order_id, i.product_id, i.product_name, i.quantity, i.price, i.subtotal '
+            'FROM order_items i JOIN orders o ON o.id = i.order_id '
+            'WHERE o.items IS NULL ORDER BY i.id'
+        )):
+            grouped.setdefault(row.order_id, []).append({
+                'product_id': row.product_id,
+                'product_name': row.product_name,
+                'quantity': row.quantity,
+                'price': row.price,
+                'subtotal': row.subtotal
+            })
+        for order_id, items in grouped.items():
+            bind.execute(
+                sa.text('UPDATE orders SET items = :items WHERE id = :id'),
+                {'items': json.dumps(items), 'id': order_id}
+            )
+        bind.execute(sa.text("UPDATE orders SET items = '[]' WHERE items IS NULL"))
+
+    with op.batch_alter_table('orders') as batch_op:
+        batch_op.alter_column('items', existing_type=sa.Text(), nullable=False)
+
+    op.drop_index('ix_order_items_product_id_order_id', table_name='order_items')
+    op.drop_index('ix_order_items_order_id', table_name='order_items')
+    op.drop_table('order_items')
@@ -1,7 +1,9 @@
 from flask import Flask, jsonify
 from flask_cors import CORS
+from flask_compress import Compress
 from config import config
-from utils.database import db, init_db
+from utils.json_provider import init_json
+from utils.database import db, init_db, pool_stats
 from routes.orders import orders_bp
 import os
 
@@ -15,6 +17,8 @@ def create_app(config_name='default'):
     
     # Initialize extensions
     CORS(app)
+    Compress(app)
+    init_json(app)
     
     # Initialize database
     init_db(app)
@@ -30,6 +34,16 @@ def create_app(config_name='default'):
             'service': 'order-service'
         }), 200
     
+    # Database pool saturation (per worker)
+    @app.route('/health/db')
+    def health_db():
+        return jsonify({
+            'status': 'healthy',
+            'service': 'order-service',
+            'pid': os.getpid(),
+            'pool': pool_stats()
+        }), 200
+    
     # Root endpoint
     @app.route('/')
     def index():
@@ -47,4 +61,4 @@ def create_app(config_name='default'):
 if __name__ == '__main__':
     app = create_app()
     port = int(os.getenv('PORT', 8003))
-    app.run(host='0.0.0.0', port=port, debug=True)
+    app.run(host='0.0.0.0', port=port, debug=app.config['DEBUG'])
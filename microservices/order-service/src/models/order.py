@@ -1,6 +1,6 @@
 from datetime import datetime
 from utils.database import db
-import json
+from models.order_item import OrderItem
 
 class Order(db.Model):
     """Order model"""
@@ -9,19 +9,41 @@ class Order(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.String(100), nullable=False)
     user_email = db.Column(db.String(200), nullable=False)
-    items = db.Column(db.Text, nullable=False)  # JSON string
     total = db.Column(db.Float, nullable=False)
     status = db.Column(db.String(50), default='pending')  # pending, confirmed, shipped, delivered, cancelled
+    reservation_id = db.Column(db.String(64), nullable=True)  # Key of the product-service stock reservation
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Loaded for a whole page of orders with one extra IN query
+    items = db.relationship(
+        OrderItem,
+        lazy='selectin',
+        order_by=OrderItem.id,
+        cascade='all, delete-orphan',
+        passive_deletes=True
+    )
+    
+    # Per-user listing, newest first (managed by migrations)
+    __table_args__ = (
+        db.Index('ix_orders_user_id_created_at', user_id, created_at.desc(), id.desc()),
+    )
+    
+    @classmethod
+    def dict_columns(cls):
+        """Columns of to_dict() (except items), for listings that skip ORM hydration"""
+        return (
+            cls.id, cls.user_id, cls.user_email, cls.total, cls.status,
+            cls.created_at, cls.updated_at
+        )
+    
     def to_dict(self):
         """Convert order to dictionary"""
         return {
             'id': self.id,
             'user_id': self.user_id,
             'user_email': self.user_email,
-            'items': json.loads(self.items) if self.items else [],
+            'items': [item.to_dict() for item in self.items],
             'total': self.total,
             'status': self.status,
             'created_at': self.created_at.isoformat() if self.created_at else None,
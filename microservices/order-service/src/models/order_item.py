@@ -0,0 +1,37 @@
+from utils.database import db
+
+class OrderItem(db.Model):
+    """One line of an order (normalized from the former orders.items JSON)"""
+    __tablename__ = 'order_items'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id', ondelete='CASCADE'), nullable=False)
+    product_id = db.Column(db.Integer, nullable=False)
+    product_name = db.Column(db.String(200), nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)
+    price = db.Column(db.Float, nullable=False)
+    subtotal = db.Column(db.Float, nullable=False)
+    
+    # Items of a page of orders (selectin load) / orders containing a product
+    __table_args__ = (
+        db.Index('ix_order_items_order_id', 'order_id'),
+        db.Index('ix_order_items_product_id_order_id', 'product_id', 'order_id'),
+    )
+    
+    @classmethod
+    def dict_columns(cls):
+        """Columns of to_dict()"""
+        return (cls.product_id, cls.product_name, cls.quantity, cls.price, cls.subtotal)
+    
+    def to_dict(self):
+        """Convert item to dictionary (same shape as the former JSON items)"""
+        return {
+            'product_id': self.product_id,
+            'product_name': self.product_name,
+            'quantity': self.quantity,
+            'price': self.price,
+            'subtotal': self.subtotal
+        }
+    
+    def __repr__(self):
+        return f'<OrderItem {self.order_id}:{self.product_id}>'
@@ -0,0 +1,23 @@
+from datetime import datetime
+from utils.database import db
+import json
+
+class OutboxEvent(db.Model):
+    """Order event waiting to be relayed to RabbitMQ (transactional outbox)"""
+    __tablename__ = 'order_outbox'
+    
+    id = db.Column(db.Integer, primary_key=True)  # Relay order
+    event_type = db.Column(db.String(50), nullable=False)
+    order_id = db.Column(db.Integer, nullable=True)
+    payload = db.Column(db.Text, nullable=False)  # JSON message body
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    published_at = db.Column(db.DateTime, nullable=True, index=True)
+    
+    @property
+    def message(self):
+        return json.loads(self.payload)
+    
+    def __repr__(self):
+        return f'<OutboxEvent {self.id} {self.event_type}>'
@@ -0,0 +1,27 @@
+from datetime import datetime
+from utils.database import db
+import json
+
+class StockRelease(db.Model):
+    """Stock of a cancelled order waiting to be given back to product-service
+    
+    Written in the transaction that cancels the order and retried by the
+    relay until product-service accepts it (transactional outbox).
+    """
+    __tablename__ = 'stock_release_outbox'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    order_id = db.Column(db.Integer, nullable=False)
+    reservation_id = db.Column(db.String(64), nullable=True)  # None for orders placed before keyed reservations
+    payload = db.Column(db.Text, nullable=False)  # JSON stock lines
+    attempts = db.Column(db.Integer, default=0, nullable=False)
+    last_error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    released_at = db.Column(db.DateTime, nullable=True, index=True)
+    
+    @property
+    def lines(self):
+        return json.loads(self.payload)
+    
+    def __repr__(self):
+        return f'<StockRelease {self.id} order {self.order_id}>'
@@ -0,0 +1,67 @@
+import sys
+import time
+from app import create_app
+from utils.outbox import relay_batch, relay_stock_releases, purge_published_events
+from utils.product_client import get_product_client
+from utils.rabbitmq import init_publisher
+
+def start_relay():
+    """Drain the order outbox to RabbitMQ and stock releases to product-service"""
+    app = create_app()
+    batch_size = app.config['OUTBOX_BATCH_SIZE']
+    poll_interval = app.config['OUTBOX_POLL_INTERVAL']
+    max_backoff = app.config['OUTBOX_MAX_BACKOFF']
+    retention_hours = app.config['OUTBOX_RETENTION_HOURS']
+    
+    print("🚀 Starting Order Outbox Relay")
+    print(f"📦 Batch size: {batch_size}, poll interval: {poll_interval}s")
+    
+    try:
+        with app.app_context():
+            publisher = init_publisher(app)
+            backoff = poll_interval
+            release_backoff = poll_interval
+            release_retry_at = 0
+            last_purge = 0
+            
+            while True:
+                published, failed = relay_batch(publisher, batch_size)
+                
+                if published:
+                    print(f"✅ Relayed {published} event(s)")
+                
+                # Product-service trouble only delays releases, not events
+                released = 0
+                if time.monotonic() >= release_retry_at:
+                    released, release_failed = relay_stock_releases(get_product_client(), batch_size)
+                    if released:
+                        print(f"✅ Released stock of {released} cancelled order(s)")
+                    if release_failed:
+                        release_retry_at = time.monotonic() + release_backoff
+                        release_backoff = min(release_backoff * 2, max_backoff)
+                    else:
+                        release_backoff = poll_interval
+                
+                if time.monotonic() - last_purge > 3600:
+                    purge_published_events(retention_hours)
+                    last_purge = time.monotonic()
+                
+                if failed:
+                    # Broker trouble: back off before retrying the same event
+                    time.sleep(backoff)
+                    backoff = min(backoff * 2, max_backoff)
+                    continue
+                
+                backoff = poll_interval
+                if published < batch_size and released < batch_size:
+                    time.sleep(poll_interval)
+    
+    except KeyboardInterrupt:
+        print("\n⚠️  Relay interrupted by user")
+        sys.exit(0)
+    except Exception as e:
+        print(f"❌ Relay error: {e}")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    start_relay()
@@ -1,12 +1,122 @@
 from flask import Blueprint, request, jsonify, current_app
 from models.order import Order
+from models.order_item import OrderItem
 from utils.database import db
-from utils.rabbitmq import publish_order_event
-import json
-import requests
+from utils.outbox import enqueue_order_event, enqueue_order_events, enqueue_stock_releases
+from utils.pagination import encode_cursor, decode_cursor, InvalidCursor
+from sqlalchemy import tuple_, update
+from datetime import datetime
+import uuid
+from utils.product_client import get_product_client, ProductServiceError, ProductRequestError
 
 orders_bp = Blueprint('orders', __name__)
 
+# Keys of OrderItem.to_dict() for the column-projected listing path
+ITEM_KEYS = [column.key for column in OrderItem.dict_columns()]
+
+VALID_STATUSES = ['pending', 'confirmed', 'shipped', 'delivered', 'cancelled']
+
+# Statuses an order may move to from each status
+STATUS_TRANSITIONS = {
+    'pending': {'confirmed', 'cancelled'},
+    'confirmed': {'shipped', 'cancelled'},
+    'shipped': {'delivered'},
+    'delivered': set(),
+    'cancelled': set()
+}
+
+def release_stock(items, reservation_id=None):
+    """Return reserved stock to product-service (compensating action)"""
+    try:
+        response = get_product_client().release_stock(items, reservation_id)
+        return response.status_code == 200
+    except ProductServiceError as e:
+        print(f"❌ Failed to release stock: {e}")
+        return False
+
+def _from_statuses(new_status):
+    """Statuses from which an order may move to `new_status`"""
+    return [status for status, targets in STATUS_TRANSITIONS.items() if new_status in targets]
+
+def _move_order(order_id, new_status, user_id=None):
+    """Move one order to `new_status` if STATUS_TRANSITIONS allows it
+    
+    A single conditional UPDATE, so of two concurrent requests only one
+    changes the row. Returns the updated row, or None if nothing changed.
+    """
+    query = update(Order).where(Order.id == order_id, Order.status.in_(_from_statuses(new_status)))
+    if user_id is not None:
+        query = query.where(Order.user_id == user_id)
+    return db.session.execute(
+        query.values(status=new_status, updated_at=datetime.utcnow())
+        .returning(Order.id, Order.user_email, Order.total, Order.reservation_id)
+        .execution_options(synchronize_session=False)
+    ).first()
+
+def _queue_stock_releases(rows):
+    """Queue the stock of just-cancelled orders (rows with id and reservation_id)
+    
+    Goes into the cancelling transaction; the relay gives the stock back
+    once it has committed, keyed by the order's reservation.
+    """
+    lines = {row.id: [] for row in rows}
+    for order_id, product_id, quantity in db.session.query(
+        OrderItem.order_id, OrderItem.product_id, OrderItem.quantity
+    ).filter(OrderItem.order_id.in_(list(lines))).order_by(OrderItem.id):
+        lines[order_id].append({'product_id': product_id, 'quantity': quantity})
+    enqueue_stock_releases([(row.id, row.reservation_id, lines[row.id]) for row in rows])
+
+def _user_orders_query(user_id, product_id=None):
+    """A user's orders, optionally only those containing `product_id`"""
+    query = Order.query.filter_by(user_id=user_id)
+    if product_id is not None:
+        query = query.filter(
+            OrderItem.query
+            .filter(OrderItem.order_id == Order.id, OrderItem.product_id == product_id)
+            .exists()
+        )
+    return query
+
+def _order_dicts(rows):
+    """Serialize rows of Order.dict_columns() plus their items (one extra query)"""
+    orders = [row._asdict() for row in rows]
+    by_id = {}
+    for order in orders:
+        order['items'] = []
+        by_id[order['id']] = order['items']
+    
+    if by_id:
+        item_rows = db.session.query(OrderItem.order_id, *OrderItem.dict_columns())\
+            .filter(OrderItem.order_id.in_(list(by_id)))\
+            .order_by(OrderItem.id)
+        for order_id, *values in item_rows:
+            by_id[order_id].append(dict(zip(ITEM_KEYS, values)))
+    return orders
+
+def _orders_cursor_page(query, cursor, per_page, include_total):
+    """Keyset page of a user's orders, newest first, on (created_at, id)"""
+    total = query.count() if include_total else None
+    
+    after = decode_cursor(cursor)
+    if after is not None:
+        try:
+            created_at, order_id = datetime.fromisoformat(after[0]), int(after[1])
+        except (TypeError, ValueError, IndexError, KeyError):
+            raise InvalidCursor('Invalid cursor')
+        query = query.filter(tuple_(Order.created_at, Order.id) < tuple_(created_at, order_id))
+    
+    orders = query.order_by(Order.created_at.desc(), Order.id.desc())\
+        .limit(per_page + 1)\
+        .all()
+    
+    next_cursor = None
+    if len(orders) > per_page:
+        orders = orders[:per_page]
+        last = orders[-1]
+        next_cursor = encode_cursor([last.created_at.isoformat(), last.id])
+    
+    return orders, next_cursor, total
+
 @orders_bp.route('/', methods=['GET'])
 def get_orders():
     """Get all orders for a user"""
@@ -23,12 +133,38 @@ def get_orders():
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
         
+        product_id = request.args.get('product_id', type=int)
+        query = _user_orders_query(user_id, product_id)\
+            .with_entities(*Order.dict_columns())
+        
+        # Cursor mode is selected by passing `cursor` (empty for the first page)
+        cursor = request.args.get('cursor')
+        if cursor is not None:
+            include_total = request.args.get('include_total', 'false').lower() == 'true'
+            try:
+                orders, next_cursor, total = _orders_cursor_page(query, cursor, per_page, include_total)
+            except InvalidCursor as e:
+                return jsonify({
+                    'success': False,
+                    'message': str(e)
+                }), 400
+            
+            payload = {
+                'success': True,
+                'orders': _order_dicts(orders),
+                'per_page': per_page,
+                'next_cursor': next_cursor
+            }
+            if include_total:
+                payload['total'] = total
+            return jsonify(payload), 200
+        
         # Query orders
-        pagination = Order.query.filter_by(user_id=user_id)\
+        pagination = query\
             .order_by(Order.created_at.desc())\
             .paginate(page=page, per_page=per_page, error_out=False)
         
-        orders = [order.to_dict() for order in pagination.items]
+        orders = _order_dicts(pagination.items)
         
         return jsonify({
             'success': True,
@@ -38,7 +174,7 @@ def get_orders():
             'per_page': per_page,
             'pages': pagination.pages
         }), 200
-        
+    
     except Exception as e:
         return jsonify({
             'success': False,
@@ -69,7 +205,7 @@ def get_order(order_id):
             'success': True,
             'order': order.to_dict()
         }), 200
-        
+    
     except Exception as e:
         return jsonify({
             'success': False,
@@ -98,77 +234,122 @@ def create_order():
                 'message': 'Order items are required'
             }), 400
         
-        # Verify products and calculate total
+        # Reject bad quantities before they reach product-service
+        for item in data['items']:
+            quantity = item.get('quantity', 1)
+            if isinstance(quantity, bool) or not isinstance(quantity, int) or quantity < 1:
+                return jsonify({
+                    'success': False,
+                    'message': f'Invalid quantity for product {item.get("product_id")}'
+                }), 400
+        
+        # Verify products and calculate total (batch lookups, fetched concurrently)
         total = 0
         items = []
-        product_service_url = current_app.config['PRODUCT_SERVICE_URL']
+        product_ids = [item.get('product_id') for item in data['items']]
+        
+        try:
+            products = get_product_client().get_products(product_ids)
+        except ProductRequestError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+        except ProductServiceError as e:
+            print(f"❌ Failed to fetch products: {e}")
+            return jsonify({
+                'success': False,
+                'message': 'Product service unavailable'
+            }), 503
         
         for item in data['items']:
             product_id = item.get('product_id')
             quantity = item.get('quantity', 1)
             
-            # Fetch product from Product Service
-            try:
-                response = requests.get(f"{product_service_url}/api/products/{product_id}")
-                if response.status_code != 200:
-                    return jsonify({
-                        'success': False,
-                        'message': f'Product {product_id} not found'
-                    }), 404
-                
-                product = response.json().get('product')
-                
-                # Check stock
-                if product['stock'] < quantity:
-                    return jsonify({
-                        'success': False,
-                        'message': f'Insufficient stock for {product["name"]}'
-                    }), 400
-                
-                # Calculate item total
-                item_total = product['price'] * quantity
-                total += item_total
-                
-                items.append({
-                    'product_id': product_id,
-                    'product_name': product['name'],
-                    'quantity': quantity,
-                    'price': product['price'],
-                    'subtotal': item_total
-                })
-                
-            except requests.RequestException as e:
+            product = products.get(str(product_id))
+            if not product:
+                return jsonify({
+                    'success': False,
+                    'message': f'Product {product_id} not found'
+                }), 404
+            
+            # Check stock
+            if product['stock'] < quantity:
                 return jsonify({
                     'success': False,
-                    'message': f'Failed to verify product {product_id}'
-                }), 500
+                    'message': f'Insufficient stock for {product["name"]}'
+                }), 400
+            
+            # Calculate item total
+            item_total = product['price'] * quantity
+            total += item_total
+            
+            items.append({
+                'product_id': int(product_id),
+                'product_name': product['name'],
+                'quantity': quantity,
+                'price': product['price'],
+                'subtotal': item_total
+            })
+        
+        # Reserve stock for the whole order in one transaction; the key lets
+        # a failed call be undone without knowing whether it was applied
+        reservation_id = uuid.uuid4().hex
+        try:
+            response = get_product_client().reserve_stock(items, reservation_id)
+        except ProductServiceError as e:
+            print(f"❌ Failed to reserve stock: {e}")
+            release_stock(items, reservation_id)
+            return jsonify({
+                'success': False,
+                'message': 'Product service unavailable'
+            }), 503
+        
+        if response.status_code in (404, 409):
+            return jsonify({
+                'success': False,
+                'message': response.json().get('message', 'Insufficient stock')
+            }), 400
+        if response.status_code != 200:
+            return jsonify({
+                'success': False,
+                'message': 'Failed to reserve stock'
+            }), 500
         
         # Create order
         order = Order(
             user_id=user_id,
             user_email=user_email,
-            items=json.dumps(items),
+            items=[OrderItem(**item) for item in items],
             total=total,
-            status='pending'
+            status='pending',
+            reservation_id=reservation_id
         )
         
-        db.session.add(order)
-        db.session.commit()
-        
-        # Publish order event to RabbitMQ
-        publish_order_event('order_created', {
-            'order_id': order.id,
-            'user_email': user_email,
-            'total': total,
-            'items': items
-        })
+        try:
+            db.session.add(order)
+            db.session.flush()
+            
+            # Queue the order event in the same transaction as the order
+            enqueue_order_event('order_created', {
+                'order_id': order.id,
+                'user_email': user_email,
+                'total': total,
+                'items': items
+            })
+            
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            release_stock(items, reservation_id)
+            raise
         
         return jsonify({
             'success': True,
             'message': 'Order created successfully',
             'order': order.to_dict()
         }), 201
-        
+    
     except Exception as e:
         db.session.rollback()
         return jsonify({
@@ -188,36 +369,39 @@ def cancel_order(order_id):
                 'message': 'User ID not provided'
             }), 401
         
-        order = Order.query.filter_by(id=order_id, user_id=user_id).first()
-        
-        if not order:
-            return jsonify({
-                'success': False,
-                'message': 'Order not found'
-            }), 404
+        row = _move_order(order_id, 'cancelled', user_id=user_id)
         
-        if order.status in ['shipped', 'delivered', 'cancelled']:
+        if row is None:
+            db.session.rollback()
+            order = Order.query.filter_by(id=order_id, user_id=user_id).first()
+            if not order:
+                return jsonify({
+                    'success': False,
+                    'message': 'Order not found'
+                }), 404
             return jsonify({
                 'success': False,
                 'message': f'Cannot cancel order with status: {order.status}'
             }), 400
         
-        order.status = 'cancelled'
-        db.session.commit()
-        
-        # Publish cancel event
-        publish_order_event('order_cancelled', {
-            'order_id': order.id,
-            'user_email': order.user_email,
-            'total': order.total
+        # Queue cancel event and stock release with the status change; only
+        # the request that cancelled the order gives its stock back
+        enqueue_order_event('order_cancelled', {
+            'order_id': row.id,
+            'user_email': row.user_email,
+            'total': row.total
         })
+        _queue_stock_releases([row])
+        
+        db.session.commit()
+        order = db.session.get(Order, order_id)
         
         return jsonify({
             'success': True,
             'message': 'Order cancelled successfully',
             'order': order.to_dict()
         }), 200
-        
+    
     except Exception as e:
         db.session.rollback()
         return jsonify({
@@ -232,38 +416,191 @@ def update_order_status(order_id):
         data = request.get_json()
         new_status = data.get('status')
         
-        valid_statuses = ['pending', 'confirmed', 'shipped', 'delivered', 'cancelled']
-        if new_status not in valid_statuses:
+        if new_status not in VALID_STATUSES:
             return jsonify({
                 'success': False,
-                'message': f'Invalid status. Must be one of: {", ".join(valid_statuses)}'
+                'message': f'Invalid status. Must be one of: {", ".join(VALID_STATUSES)}'
             }), 400
         
-        order = Order.query.get(order_id)
+        row = _move_order(order_id, new_status)
         
-        if not order:
+        if row is None:
+            db.session.rollback()
+            order = db.session.get(Order, order_id)
+            if not order:
+                return jsonify({
+                    'success': False,
+                    'message': 'Order not found'
+                }), 404
             return jsonify({
                 'success': False,
-                'message': 'Order not found'
-            }), 404
-        
-        order.status = new_status
-        db.session.commit()
+                'message': f'Cannot change order status from {order.status} to {new_status}'
+            }), 400
         
-        # Publish status update event
-        publish_order_event('order_status_updated', {
-            'order_id': order.id,
-            'user_email': order.user_email,
+        # Queue status update event with the status change
+        enqueue_order_event('order_status_updated', {
+            'order_id': row.id,
+            'user_email': row.user_email,
             'status': new_status,
-            'total': order.total
+            'total': row.total
         })
+        if new_status == 'cancelled':
+            _queue_stock_releases([row])
+        
+        db.session.commit()
+        order = db.session.get(Order, order_id)
         
         return jsonify({
             'success': True,
             'message': 'Order status updated successfully',
             'order': order.to_dict()
         }), 200
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+def _bulk_status_filter(data):
+    """Build WHERE clauses from the `filter` of a bulk status request"""
+    filters = data.get('filter') or {}
+    clauses = []
+    if filters.get('status'):
+        clauses.append(Order.status == filters['status'])
+    if filters.get('user_id'):
+        clauses.append(Order.user_id == str(filters['user_id']))
+    if filters.get('created_after'):
+        clauses.append(Order.created_at >= datetime.fromisoformat(filters['created_after']))
+    if filters.get('created_before'):
+        clauses.append(Order.created_at < datetime.fromisoformat(filters['created_before']))
+    return clauses
+
+def _apply_status_chunk(order_ids, new_status, from_statuses):
+    """Move one chunk of orders to `new_status` with a single UPDATE
+    
+    Only rows whose current status allows the transition are changed; the
+    events for the changed rows (and, for cancellations, their stock
+    releases) are queued in the same transaction. Returns the updated rows.
+    """
+    rows = db.session.execute(
+        update(Order)
+        .where(Order.id.in_(order_ids), Order.status.in_(from_statuses))
+        .values(status=new_status, updated_at=datetime.utcnow())
+        .returning(Order.id, Order.user_email, Order.total, Order.reservation_id)
+        .execution_options(synchronize_session=False)
+    ).all()
+    
+    if new_status == 'cancelled' and rows:
+        _queue_stock_releases(rows)
+    
+    enqueue_order_events('order_status_updated', [
+        {
+            'order_id': row.id,
+            'user_email': row.user_email,
+            'status': new_status,
+            'total': row.total
+        }
+        for row in rows
+    ])
+    db.session.commit()
+    return rows
+
+@orders_bp.route('/bulk/status', methods=['PATCH'])
+def bulk_update_order_status():
+    """Update the status of many orders (admin only)
+    
+    Body: {"status": "shipped", "order_ids": [1, 2, ...]}
+       or {"status": "shipped", "filter": {"status": "confirmed", "created_before": "..."}}
+    Orders are updated in chunks of BULK_STATUS_CHUNK_SIZE, one transaction each.
+    """
+    try:
+        data = request.get_json() or {}
+        new_status = data.get('status')
         
+        if new_status not in VALID_STATUSES:
+            return jsonify({
+                'success': False,
+                'message': f'Invalid status. Must be one of: {", ".join(VALID_STATUSES)}'
+            }), 400
+        
+        from_statuses = _from_statuses(new_status)
+        if not from_statuses:
+            return jsonify({
+                'success': False,
+                'message': f'No order can be moved to status: {new_status}'
+            }), 400
+        
+        max_ids = current_app.config['BULK_STATUS_MAX_IDS']
+        chunk_size = current_app.config['BULK_STATUS_CHUNK_SIZE']
+        
+        order_ids = data.get('order_ids')
+        if order_ids is not None:
+            try:
+                order_ids = list(dict.fromkeys(int(order_id) for order_id in order_ids))
+            except (TypeError, ValueError):
+                return jsonify({
+                    'success': False,
+                    'message': 'order_ids must be a list of integers'
+                }), 400
+        else:
+            try:
+                clauses = _bulk_status_filter(data)
+            except (TypeError, ValueError):
+                return jsonify({
+                    'success': False,
+                    'message': 'Invalid filter'
+                }), 400
+            if not clauses:
+                return jsonify({
+                    'success': False,
+                    'message': 'order_ids or a filter is required'
+                }), 400
+            
+            order_ids = [
+                row.id for row in db.session.query(Order.id)
+                .filter(*clauses, Order.status.in_(from_statuses))
+                .order_by(Order.id)
+                .limit(max_ids + 1)
+            ]
+        
+        if not order_ids:
+            return jsonify({
+                'success': False,
+                'message': 'No orders to update'
+            }), 400
+        if len(order_ids) > max_ids:
+            return jsonify({
+                'success': False,
+                'message': f'Too many orders (max {max_ids} per request)'
+            }), 400
+        
+        updated = []
+        for i in range(0, len(order_ids), chunk_size):
+            rows = _apply_status_chunk(order_ids[i:i + chunk_size], new_status, from_statuses)
+            updated.extend(row.id for row in rows)
+        
+        # Report the requested orders that were not changed
+        remaining = set(order_ids).difference(updated)
+        skipped = []
+        for i in range(0, len(order_ids), chunk_size):
+            chunk = [order_id for order_id in order_ids[i:i + chunk_size] if order_id in remaining]
+            if chunk:
+                skipped.extend(
+                    {'id': row.id, 'status': row.status}
+                    for row in db.session.query(Order.id, Order.status).filter(Order.id.in_(chunk))
+                )
+        not_found = sorted(remaining.difference(order['id'] for order in skipped))
+        
+        return jsonify({
+            'success': True,
+            'message': f'{len(updated)} order(s) updated to {new_status}',
+            'updated': len(updated),
+            'skipped': skipped,
+            'not_found': not_found
+        }), 200
+    
     except Exception as e:
         db.session.rollback()
         return jsonify({
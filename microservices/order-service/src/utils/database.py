@@ -1,12 +1,69 @@
 from flask_sqlalchemy import SQLAlchemy
+from flask_migrate import Migrate
+from sqlalchemy import event
+import os
 
 db = SQLAlchemy()
+migrate = Migrate()
+
+# Pool usage counters of this worker process (see pool_stats)
+_pool_counters = {'checkouts': 0, 'peak_checked_out': 0}
+
+# Schema changes are managed by Alembic migrations (flask db upgrade)
+MIGRATIONS_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'migrations'
+)
+
+def configure_engine(app):
+    """Attach pool metrics and pooler-specific connection settings"""
+    engine = db.engine
+    
+    @event.listens_for(engine, 'checkout')
+    def track_checkout(dbapi_connection, connection_record, connection_proxy):
+        _pool_counters['checkouts'] += 1
+        checked_out = getattr(engine.pool, 'checkedout', lambda: 0)()
+        if checked_out > _pool_counters['peak_checked_out']:
+            _pool_counters['peak_checked_out'] = checked_out
+    
+    # Behind a transaction-mode pooler session settings do not stick,
+    # so the statement timeout is set at the start of every transaction
+    timeout = app.config['DB_STATEMENT_TIMEOUT_MS']
+    if app.config['DB_POOL_MODE'] == 'pgbouncer' and timeout and engine.dialect.name == 'postgresql':
+        @event.listens_for(engine, 'begin')
+        def set_statement_timeout(connection):
+            connection.exec_driver_sql(f'SET LOCAL statement_timeout = {int(timeout)}')
+
+def pool_stats():
+    """Connection pool saturation for this worker process"""
+    pool = db.engine.pool
+    stats = {
+        'pool_class': type(pool).__name__,
+        'checkouts': _pool_counters['checkouts'],
+        'peak_checked_out': _pool_counters['peak_checked_out']
+    }
+    if hasattr(pool, 'checkedout'):
+        capacity = pool.size() + max(pool._max_overflow, 0)
+        stats.update({
+            'size': pool.size(),
+            'max_overflow': pool._max_overflow,
+            'checked_out': pool.checkedout(),
+            'checked_in': pool.checkedin(),
+            'overflow': pool.overflow(),
+            'saturation': round(pool.checkedout() / capacity, 4) if capacity else 0.0
+        })
+    return stats
 
 def init_db(app):
     """Initialize database"""
     db.init_app(app)
+    migrate.init_app(app, db, directory=MIGRATIONS_DIR)
     
     with app.app_context():
-        # Create tables
-        db.create_all()
+        configure_engine(app)
+        
+        # Tests build the schema straight from the models; every other
+        # environment runs `flask --app src/app db upgrade` before starting
+        if app.config['DB_AUTO_CREATE']:
+            db.create_all()
         print("✅ Database initialized")
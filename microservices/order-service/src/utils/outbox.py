@@ -0,0 +1,156 @@
+from datetime import datetime, timedelta
+from sqlalchemy import insert
+from utils.database import db
+from models.outbox import OutboxEvent
+from models.stock_release import StockRelease
+from utils.product_client import ProductServiceError
+import json
+
+def _event_message(event_type, order_data):
+    message = {
+        'event_type': event_type,
+        'order_id': order_data.get('order_id'),
+        'user_email': order_data.get('user_email'),
+        'total': order_data.get('total'),
+        'items': order_data.get('items', [])
+    }
+    if 'status' in order_data:
+        message['status'] = order_data['status']
+    return message
+
+def enqueue_order_event(event_type, order_data):
+    """Add an order event to the outbox in the caller's transaction
+    
+    The event is only visible to the relay once the surrounding
+    db.session.commit() succeeds, so it is never lost and never published
+    for an order that was rolled back.
+    """
+    event = OutboxEvent(
+        event_type=event_type,
+        order_id=order_data.get('order_id'),
+        payload=json.dumps(_event_message(event_type, order_data))
+    )
+    db.session.add(event)
+    return event
+
+def enqueue_order_events(event_type, orders_data):
+    """Add many order events to the outbox with one multi-row INSERT"""
+    if not orders_data:
+        return 0
+    now = datetime.utcnow()
+    db.session.execute(insert(OutboxEvent), [
+        {
+            'event_type': event_type,
+            'order_id': order_data.get('order_id'),
+            'payload': json.dumps(_event_message(event_type, order_data)),
+            'attempts': 0,
+            'created_at': now
+        }
+        for order_data in orders_data
+    ])
+    return len(orders_data)
+
+def enqueue_stock_releases(releases):
+    """Queue the stock of cancelled orders for release, in the caller's transaction
+    
+    `releases` are (order_id, reservation_id, lines) tuples. The relay sends
+    each one to product-service once the cancellation has committed, and
+    retries it until it is accepted; keyed releases are applied at most once.
+    """
+    if not releases:
+        return 0
+    now = datetime.utcnow()
+    db.session.execute(insert(StockRelease), [
+        {
+            'order_id': order_id,
+            'reservation_id': reservation_id,
+            'payload': json.dumps(lines),
+            'attempts': 0,
+            'created_at': now
+        }
+        for order_id, reservation_id, lines in releases
+    ])
+    return len(releases)
+
+def _pending_events_query(batch_size):
+    query = OutboxEvent.query\
+        .filter(OutboxEvent.published_at.is_(None))\
+        .order_by(OutboxEvent.id)\
+        .limit(batch_size)
+    
+    # Let several relays run side by side without publishing a row twice
+    if db.engine.dialect.name == 'postgresql':
+        query = query.with_for_update(skip_locked=True)
+    return query
+
+def relay_batch(publisher, batch_size=100):
+    """Publish one batch of pending outbox events in insertion order
+    
+    Stops at the first failure so later events never overtake an earlier one.
+    Returns (published, failed).
+    """
+    events = _pending_events_query(batch_size).all()
+    published = 0
+    
+    for event in events:
+        try:
+            publisher.publish(event.message)
+        except Exception as e:
+            event.attempts += 1
+            event.last_error = str(e)[:1000]
+            db.session.commit()
+            print(f"❌ Failed to relay event {event.id} ({event.event_type}): {e}")
+            return published, 1
+        
+        event.published_at = datetime.utcnow()
+        event.attempts += 1
+        published += 1
+    
+    db.session.commit()
+    return published, 0
+
+def relay_stock_releases(client, batch_size=100):
+    """Send one batch of pending stock releases to product-service
+    
+    Stops at the first call that fails (product-service down or circuit
+    open) so the relay can back off. A release product-service rejects
+    (4xx) is not retried. Returns (released, failed).
+    """
+    query = StockRelease.query\
+        .filter(StockRelease.released_at.is_(None))\
+        .order_by(StockRelease.id)\
+        .limit(batch_size)
+    if db.engine.dialect.name == 'postgresql':
+        query = query.with_for_update(skip_locked=True)
+    
+    released = 0
+    for release in query.all():
+        release.attempts += 1
+        try:
+            response = client.release_stock(release.lines, release.reservation_id)
+        except ProductServiceError as e:
+            release.last_error = str(e)[:1000]
+            db.session.commit()
+            print(f"❌ Failed to release stock of order {release.order_id}: {e}")
+            return released, 1
+        
+        if response.status_code != 200:
+            release.last_error = response.text[:1000]
+            print(f"❌ Stock release of order {release.order_id} rejected ({response.status_code})")
+        release.released_at = datetime.utcnow()
+        released += 1
+    
+    db.session.commit()
+    return released, 0
+
+def purge_published_events(retention_hours):
+    """Delete relayed events and stock releases older than the retention window"""
+    cutoff = datetime.utcnow() - timedelta(hours=retention_hours)
+    deleted = OutboxEvent.query\
+        .filter(OutboxEvent.published_at.isnot(None), OutboxEvent.published_at < cutoff)\
+        .delete(synchronize_session=False)
+    deleted += StockRelease.query\
+        .filter(StockRelease.released_at.isnot(None), StockRelease.released_at < cutoff)\
+        .delete(synchronize_session=False)
+    db.session.commit()
+    return deleted
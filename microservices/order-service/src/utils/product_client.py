@@ -0,0 +1,212 @@
+import os
+import random
+import threading
+import time
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from flask import current_app
+
+class ProductServiceError(Exception):
+    """Product service unreachable, failing, or short-circuited"""
+
+class ProductRequestError(Exception):
+    """Product service rejected the request (4xx)"""
+
+class CircuitBreaker:
+    """Stop calling a failing dependency for a while
+    
+    closed -> open after `failure_threshold` consecutive failures;
+    open -> half-open after `reset_timeout` seconds, where one trial call
+    decides whether to close again or re-open.
+    """
+    
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+    
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+    
+    def allow_request(self):
+        with self._lock:
+            state = self.state
+            if state == 'half-open':
+                # Let a single trial request through
+                self.opened_at = time.monotonic()
+                return True
+            return state == 'closed'
+    
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+    
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+class ProductClient:
+    """Keep-alive HTTP client for product-service
+    
+    One pooled requests.Session per worker process, with connect/read
+    timeouts, bounded retries with jittered backoff and a circuit breaker.
+    """
+    
+    def __init__(self, config):
+        self.base_url = config['PRODUCT_SERVICE_URL'].rstrip('/')
+        self.timeout = (
+            config['PRODUCT_SERVICE_CONNECT_TIMEOUT'],
+            config['PRODUCT_SERVICE_READ_TIMEOUT']
+        )
+        self.retries = config['PRODUCT_SERVICE_RETRIES']
+        self.backoff = config['PRODUCT_SERVICE_RETRY_BACKOFF']
+        self.breaker = CircuitBreaker(
+            failure_threshold=config['PRODUCT_SERVICE_CIRCUIT_THRESHOLD'],
+            reset_timeout=config['PRODUCT_SERVICE_CIRCUIT_RESET']
+        )
+        
+        self.session = requests.Session()
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=config['PRODUCT_SERVICE_POOL_SIZE'],
+            max_retries=0
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        
+        # Large carts are split into batch calls that run concurrently
+        self.batch_size = config['PRODUCT_SERVICE_BATCH_SIZE']
+        self.executor = ThreadPoolExecutor(
+            max_workers=config['PRODUCT_SERVICE_MAX_CONCURRENCY'],
+            thread_name_prefix='product-client'
+        )
+    
+    def request(self, method, path, idempotent=True, **kwargs):
+        """Send a request and return the response (4xx included)
+        
+        Non-idempotent calls are only retried when the connection could not
+        be established, i.e. the request was never sent.
+        """
+        if not self.breaker.allow_request():
+            raise ProductServiceError('Product service circuit is open')
+        
+        kwargs.setdefault('timeout', self.timeout)
+        url = f"{self.base_url}{path}"
+        
+        for attempt in range(self.retries + 1):
+            try:
+                response = self.session.request(method, url, **kwargs)
+                if response.status_code < 500:
+                    self.breaker.record_success()
+                    return response
+                error = ProductServiceError(f'Product service returned {response.status_code}')
+                retryable = idempotent
+            except requests.exceptions.ConnectTimeout as e:
+                error, retryable = ProductServiceError(str(e)), True
+            except requests.exceptions.ConnectionError as e:
+                error, retryable = ProductServiceError(str(e)), idempotent
+            except requests.RequestException as e:
+                error, retryable = ProductServiceError(str(e)), idempotent
+            
+            if not retryable or attempt >= self.retries:
+                break
+            # Exponential backoff with full jitter
+            time.sleep(random.uniform(0, self.backoff * (2 ** attempt)))
+        
+        self.breaker.record_failure()
+        raise error
+    
+    def _get_batch(self, product_ids):
+        response = self.request(
+            'GET', '/api/products/batch',
+            params={'ids': ','.join(product_ids)}
+        )
+        if response.status_code != 200:
+            raise ProductRequestError(response.json().get('message', 'Invalid product IDs'))
+        return response.json().get('products', [])
+    
+    def get_products(self, product_ids):
+        """Fetch products by ID, keyed by str(id)
+        
+        One batch call per `batch_size` IDs; the calls run concurrently
+        (bounded by the executor), so latency stays close to one lookup.
+        """
+        unique_ids = list(dict.fromkeys(str(pid) for pid in product_ids))
+        chunks = [
+            unique_ids[i:i + self.batch_size]
+            for i in range(0, len(unique_ids), self.batch_size)
+        ]
+        
+        if len(chunks) == 1:
+            batches = [self._get_batch(chunks[0])]
+        else:
+            batches = list(self.executor.map(self._get_batch, chunks))
+        
+        return {
+            str(product['id']): product
+            for batch in batches
+            for product in batch
+        }
+    
+    def reserve_stock(self, items, reservation_id=None):
+        """Atomically reserve stock for all order items
+        
+        With a `reservation_id` product-service applies the reservation at
+        most once, so the call is safe to retry.
+        """
+        return self.request(
+            'POST', '/api/products/stock/reserve',
+            idempotent=reservation_id is not None,
+            json=_stock_payload(items, reservation_id)
+        )
+    
+    def release_stock(self, items, reservation_id=None):
+        """Return reserved stock (compensating action)
+        
+        With a `reservation_id` only that reservation is undone, and only if
+        it was applied; a reserve arriving later with the same ID is refused.
+        """
+        return self.request(
+            'POST', '/api/products/stock/release',
+            idempotent=reservation_id is not None,
+            json=_stock_payload(items, reservation_id)
+        )
+
+def _stock_lines(items):
+    """Reduce order items to the payload expected by the product-service stock API"""
+    return [
+        {'product_id': item['product_id'], 'quantity': item['quantity']}
+        for item in items
+    ]
+
+def _stock_payload(items, reservation_id):
+    """Stock API request body, keyed by `reservation_id` when given"""
+    payload = {'items': _stock_lines(items)}
+    if reservation_id is not None:
+        payload['reservation_id'] = reservation_id
+    return payload
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+def get_product_client():
+    """Return the per-process client (a new one after fork)"""
+    global _client, _client_pid
+    if _client is None or _client_pid != os.getpid():
+        with _client_lock:
+            if _client is None or _client_pid != os.getpid():
+                _client = ProductClient(current_app.config)
+                _client_pid = os.getpid()
+    return _client
@@ -1,54 +1,139 @@
 import pika
 import json
+import os
+import threading
+import time
 from flask import current_app
 
-def publish_order_event(event_type, order_data):
-    """Publish order event to RabbitMQ"""
-    try:
-        # Connection parameters
-        credentials = pika.PlainCredentials(
-            current_app.config['RABBITMQ_USER'],
-            current_app.config['RABBITMQ_PASSWORD']
-        )
+class EventPublisher:
+    """Long-lived RabbitMQ publisher
+    
+    One instance per worker process: the connection and channel are reused for
+    every message, the queue is declared once per connection, publisher
+    confirms are enabled and a dropped connection is re-opened with backoff.
+    """
+    
+    def __init__(self, config):
+        self.host = config['RABBITMQ_HOST']
+        self.port = config['RABBITMQ_PORT']
+        self.user = config['RABBITMQ_USER']
+        self.password = config['RABBITMQ_PASSWORD']
+        self.queue_name = config['RABBITMQ_QUEUE']
+        self.max_retries = config.get('RABBITMQ_PUBLISH_RETRIES', 3)
+        self.backoff = config.get('RABBITMQ_RECONNECT_BACKOFF', 0.5)
+        self.max_backoff = config.get('RABBITMQ_RECONNECT_MAX_BACKOFF', 5.0)
+        self.confirm_delivery = config.get('RABBITMQ_CONFIRM_DELIVERY', True)
+        self.heartbeat = config.get('RABBITMQ_HEARTBEAT', 60)
+        
+        self._connection = None
+        self._channel = None
+        self._pid = None
+        self._lock = threading.Lock()
+    
+    def _connect(self):
+        """Open connection and channel, enable confirms and declare the queue"""
+        credentials = pika.PlainCredentials(self.user, self.password)
         parameters = pika.ConnectionParameters(
-            host=current_app.config['RABBITMQ_HOST'],
-            port=current_app.config['RABBITMQ_PORT'],
-            credentials=credentials
+            host=self.host,
+            port=self.port,
+            credentials=credentials,
+            heartbeat=self.heartbeat,
+            blocked_connection_timeout=30
         )
         
-        # Connect to RabbitMQ
-        connection = pika.BlockingConnection(parameters)
-        channel = connection.channel()
-        
-        # Declare queue
-        queue_name = current_app.config['RABBITMQ_QUEUE']
-        channel.queue_declare(queue=queue_name, durable=True)
+        self._connection = pika.BlockingConnection(parameters)
+        self._channel = self._connection.channel()
+        if self.confirm_delivery:
+            self._channel.confirm_delivery()
+        self._channel.queue_declare(queue=self.queue_name, durable=True)
+        self._pid = os.getpid()
+        print(f"✅ Event publisher connected (queue '{self.queue_name}')")
+    
+    def _ensure_channel(self):
+        """Reconnect if the channel is gone or was inherited from a parent process"""
+        if self._pid != os.getpid():
+            # Connections must never be shared across a fork (gunicorn --preload)
+            self._connection = None
+            self._channel = None
         
-        # Prepare message
-        message = {
-            'event_type': event_type,
-            'order_id': order_data.get('order_id'),
-            'user_email': order_data.get('user_email'),
-            'total': order_data.get('total'),
-            'items': order_data.get('items', [])
-        }
-        
-        # Publish message
-        channel.basic_publish(
-            exchange='',
-            routing_key=queue_name,
-            body=json.dumps(message),
-            properties=pika.BasicProperties(
-                delivery_mode=2,  # Make message persistent
-            )
+        if self._channel is None or self._channel.is_closed or self._connection.is_closed:
+            self._close()
+            self._connect()
+        else:
+            # Service heartbeats that arrived while the connection was idle
+            self._connection.process_data_events(time_limit=0)
+    
+    def _close(self):
+        try:
+            if self._connection is not None and self._connection.is_open and self._pid == os.getpid():
+                self._connection.close()
+        except Exception:
+            pass
+        self._connection = None
+        self._channel = None
+    
+    def connect(self):
+        """Connect eagerly (called at startup); failures are retried on publish"""
+        with self._lock:
+            try:
+                self._ensure_channel()
+                return True
+            except Exception as e:
+                print(f"⚠️  Event publisher not connected yet: {e}")
+                self._close()
+                return False
+    
+    def publish(self, message):
+        """Publish a message, reconnecting with exponential backoff on failure"""
+        body = json.dumps(message)
+        properties = pika.BasicProperties(
+            delivery_mode=2,  # Make message persistent
+            content_type='application/json'
         )
         
-        print(f"✅ Published {event_type} event for order {order_data.get('order_id')}")
-        
-        # Close connection
-        connection.close()
-        
-        return True
-    except Exception as e:
-        print(f"❌ Failed to publish event: {e}")
-        return False
+        with self._lock:
+            delay = self.backoff
+            for attempt in range(self.max_retries + 1):
+                try:
+                    self._ensure_channel()
+                    self._channel.basic_publish(
+                        exchange='',
+                        routing_key=self.queue_name,
+                        body=body,
+                        properties=properties
+                    )
+                    return True
+                except pika.exceptions.UnroutableError:
+                    # Broker accepted the connection but could not route the message
+                    raise
+                except Exception as e:
+                    self._close()
+                    if attempt >= self.max_retries:
+                        raise
+                    print(f"⚠️  Publish failed ({e}), reconnecting in {delay:.1f}s")
+                    time.sleep(delay)
+                    delay = min(delay * 2, self.max_backoff)
+    
+    def close(self):
+        with self._lock:
+            self._close()
+
+_publisher = None
+_publisher_lock = threading.Lock()
+
+def get_publisher(config=None):
+    """Return the per-process publisher, creating it on first use"""
+    global _publisher
+    if _publisher is None:
+        with _publisher_lock:
+            if _publisher is None:
+                _publisher = EventPublisher(config if config is not None else current_app.config)
+    return _publisher
+
+def init_publisher(app):
+    """Create the publisher and declare the queue once at startup"""
+    publisher = get_publisher(app.config)
+    if not app.config.get('TESTING'):
+        publisher.connect()
+    app.extensions['event_publisher'] = publisher
+    return publisher
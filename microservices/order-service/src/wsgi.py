@@ -0,0 +1,12 @@
+import os
+from app import create_app
+from utils.database import db
+
+app = create_app()
+
+def _dispose_engine():
+    """Forked workers must not reuse the parent's pooled DB connections"""
+    with app.app_context():
+        db.engine.dispose(close=False)
+
+os.register_at_fork(after_in_child=_dispose_engine)
@@ -0,0 +1,46 @@
+"""product full-text search vector
+
+Revision ID: 8d24e6b0c5a1
+Revises: 3f1c9a7e2b10
+Create Date: 2026-10-18 09:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d24e6b0c5a1'
+down_revision = '3f1c9a7e2b10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    # Weighted so that name matches rank above description matches
+    op.execute("""
+        ALTER TABLE products ADD COLUMN IF NOT EXISTS search_vector tsvector
+            GENERATED ALWAYS AS (
+                setweight(to_tsvector('simple', coalesce(name, '')), 'A') ||
+                setweight(to_tsvector('simple', coalesce(description, '')), 'B')
+            ) STORED
+    """)
+
+    # CONCURRENTLY keeps the table writable while the index builds
+    with op.get_context().autocommit_block():
+        op.execute(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_products_search_vector '
+            'ON products USING GIN (search_vector)'
+        )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    with op.get_context().autocommit_block():
+        op.execute('DROP INDEX CONCURRENTLY IF EXISTS ix_products_search_vector')
+    op.execute('ALTER TABLE products DROP COLUMN IF EXISTS search_vector')
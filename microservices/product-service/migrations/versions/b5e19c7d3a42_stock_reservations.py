@@ -0,0 +1,30 @@
+"""keyed stock reservations
+
+Revision ID: b5e19c7d3a42
+Revises: f2b8d6a41c93
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b5e19c7d3a42'
+down_revision = 'f2b8d6a41c93'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'stock_reservations',
+        sa.Column('reservation_id', sa.String(length=64), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('reservation_id')
+    )
+
+
+def downgrade():
+    op.drop_table('stock_reservations')
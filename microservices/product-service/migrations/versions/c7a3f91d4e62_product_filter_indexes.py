@@ -0,0 +1,48 @@
+"""product category and price indexes
+
+Revision ID: c7a3f91d4e62
+Revises: 8d24e6b0c5a1
+Create Date: 2026-10-18 09:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7a3f91d4e62'
+down_revision = '8d24e6b0c5a1'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = {
+    'ix_products_category_price': ('category', 'price'),
+    'ix_products_price': ('price',)
+}
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        for name, columns in INDEXES.items():
+            op.create_index(name, 'products', list(columns))
+        return
+
+    # CONCURRENTLY keeps the table writable while the indexes build
+    with op.get_context().autocommit_block():
+        for name, columns in INDEXES.items():
+            op.execute(
+                f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} '
+                f'ON products ({", ".join(columns)})'
+            )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        for name in INDEXES:
+            op.drop_index(name, table_name='products')
+        return
+
+    with op.get_context().autocommit_block():
+        for name in INDEXES:
+            op.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
@@ -0,0 +1,48 @@
+"""category facets summary table
+
+Revision ID: f2b8d6a41c93
+Revises: c7a3f91d4e62
+Create Date: 2026-10-18 09:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f2b8d6a41c93'
+down_revision = 'c7a3f91d4e62'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'category_facets',
+        sa.Column('category', sa.String(length=100), nullable=False),
+        sa.Column('product_count', sa.Integer(), nullable=False),
+        sa.Column('in_stock_count', sa.Integer(), nullable=False),
+        sa.Column('min_price', sa.Float(), nullable=True),
+        sa.Column('max_price', sa.Float(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('category')
+    )
+
+    # Backfill in one pass; the write routes keep it current from here on
+    op.execute("""
+        INSERT INTO category_facets
+            (category, product_count, in_stock_count, min_price, max_price, updated_at)
+        SELECT category,
+               COUNT(id),
+               COALESCE(SUM(CASE WHEN stock > 0 THEN 1 ELSE 0 END), 0),
+               MIN(price),
+               MAX(price),
+               CURRENT_TIMESTAMP
+        FROM products
+        WHERE category IS NOT NULL AND category <> ''
+        GROUP BY category
+    """)
+
+
+def downgrade():
+    op.drop_table('category_facets')
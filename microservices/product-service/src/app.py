@@ -1,7 +1,10 @@
 from flask import Flask, jsonify
 from flask_cors import CORS
+from flask_compress import Compress
 from config import config
-from utils.database import db, init_db
+from utils.json_provider import init_json
+from utils.database import db, init_db, pool_stats
+from utils.cache import init_cache, cache_stats
 from routes.products import products_bp
 import os
 
@@ -15,10 +18,15 @@ def create_app(config_name='default'):
     
     # Initialize extensions
     CORS(app)
+    Compress(app)
+    init_json(app)
     
     # Initialize database and seed data
     init_db(app)
     
+    # Initialize Redis cache
+    init_cache(app)
+    
     # Register blueprints
     app.register_blueprint(products_bp, url_prefix='/api/products')
     
@@ -30,6 +38,26 @@ def create_app(config_name='default'):
             'service': 'product-service'
         }), 200
     
+    # Cache statistics (per worker)
+    @app.route('/health/cache')
+    def health_cache():
+        return jsonify({
+            'status': 'healthy',
+            'service': 'product-service',
+            'pid': os.getpid(),
+            'cache': cache_stats()
+        }), 200
+    
+    # Database pool saturation (per worker)
+    @app.route('/health/db')
+    def health_db():
+        return jsonify({
+            'status': 'healthy',
+            'service': 'product-service',
+            'pid': os.getpid(),
+            'pool': pool_stats()
+        }), 200
+    
     # Root endpoint
     @app.route('/')
     def index():
@@ -47,4 +75,4 @@ def create_app(config_name='default'):
 if __name__ == '__main__':
     app = create_app()
     port = int(os.getenv('PORT', 8001))
-    app.run(host='0.0.0.0', port=port, debug=True)
+    app.run(host='0.0.0.0', port=port, debug=app.config['DEBUG'])
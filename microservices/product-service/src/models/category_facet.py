@@ -0,0 +1,26 @@
+from datetime import datetime
+from utils.database import db
+
+class CategoryFacet(db.Model):
+    """Per-category summary of the catalogue (maintained by utils/facets.py)"""
+    __tablename__ = 'category_facets'
+    
+    category = db.Column(db.String(100), primary_key=True)
+    product_count = db.Column(db.Integer, nullable=False, default=0)
+    in_stock_count = db.Column(db.Integer, nullable=False, default=0)
+    min_price = db.Column(db.Float, nullable=True)
+    max_price = db.Column(db.Float, nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        """Convert facet to dictionary"""
+        return {
+            'category': self.category,
+            'product_count': self.product_count,
+            'in_stock_count': self.in_stock_count,
+            'min_price': self.min_price,
+            'max_price': self.max_price
+        }
+    
+    def __repr__(self):
+        return f'<CategoryFacet {self.category}>'
@@ -15,6 +15,33 @@ class Product(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
+    # Hot filter shapes of get_products (managed by migrations)
+    __table_args__ = (
+        db.Index('ix_products_category_price', 'category', 'price'),
+        db.Index('ix_products_price', 'price'),
+    )
+    
+    @classmethod
+    def dict_columns(cls):
+        """Columns of to_dict(), for listings that skip ORM hydration
+        
+        `row._asdict()` of a query on these columns has the keys of
+        to_dict(); datetimes are left raw for the JSON provider.
+        """
+        return (
+            cls.id, cls.name, cls.description, cls.price, cls.stock,
+            cls.category, cls.image, cls.created_at, cls.updated_at
+        )
+    
+    @classmethod
+    def row_to_dict(cls, row):
+        """to_dict() of a dict_columns() row, for payloads that are cached"""
+        data = row._asdict()
+        for key in ('created_at', 'updated_at'):
+            if data[key] is not None:
+                data[key] = data[key].isoformat()
+        return data
+    
     def to_dict(self):
         """Convert product to dictionary"""
         return {
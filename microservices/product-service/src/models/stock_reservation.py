@@ -0,0 +1,18 @@
+from datetime import datetime
+from utils.database import db
+
+class StockReservation(db.Model):
+    """Idempotency record of a keyed stock reservation
+    
+    `reserved` while the stock is held; `released` once it was given back,
+    or when a release arrived for a reservation that never committed (a
+    late reserve with that ID is then refused).
+    """
+    __tablename__ = 'stock_reservations'
+    
+    reservation_id = db.Column(db.String(64), primary_key=True)
+    status = db.Column(db.String(20), nullable=False, default='reserved')
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<StockReservation {self.reservation_id} {self.status}>'
@@ -1,10 +1,106 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, request, jsonify, current_app, stream_with_context
 from models.product import Product
-from utils.database import db
-from sqlalchemy import or_
+from models.stock_reservation import StockReservation
+from utils.database import db, dialect_insert
+from utils import cache, bulk
+from utils.facets import refresh_category_facets, category_facets
+from utils.pagination import encode_cursor, decode_cursor, InvalidCursor
+from utils.search import apply_search
+from utils.conditional import make_etag, not_modified, validator_headers, parse_timestamp, from_version
+from sqlalchemy import func, update, tuple_
 
 products_bp = Blueprint('products', __name__)
 
+# Keyset sort orders for cursor pagination: (key columns, descending)
+CURSOR_SORTS = {
+    'id': ((Product.id,), False),
+    'price': ((Product.price, Product.id), False),
+    '-price': ((Product.price, Product.id), True)
+}
+
+# Columns selectable on listings with `fields=` (the keys of Product.to_dict())
+PRODUCT_FIELDS = {column.key: column for column in Product.dict_columns()}
+
+# Bulk import/export formats and their content types
+BULK_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv'
+}
+
+def _catalogue_version():
+    """(version, last_modified) of the whole catalogue, without loading it
+    
+    Comes from the version key the write routes bump in Redis. Without Redis,
+    the row count plus the newest updated_at is used; deletes only move the
+    count, so no Last-Modified is given then.
+    """
+    version = cache.get_catalogue_version()
+    if version is not None:
+        return version, from_version(version)
+    
+    count, latest = db.session.query(func.count(Product.id), func.max(Product.updated_at)).one()
+    return f'{count}-{latest}', None
+
+def _listing_columns(fields, sort=None):
+    """Columns to SELECT for `fields` (comma-separated to_dict() keys)
+    
+    None selects every column. `id` and the cursor sort keys are always
+    selected, since pagination needs them. Raises ValueError on unknown names.
+    """
+    if fields is None:
+        return Product.dict_columns()
+    
+    names = {name.strip() for name in fields.split(',') if name.strip()}
+    unknown = names - PRODUCT_FIELDS.keys()
+    if unknown:
+        raise ValueError(f'Invalid fields: {", ".join(sorted(unknown))}. '
+                         f'Must be a subset of: {", ".join(PRODUCT_FIELDS)}')
+    
+    names.add('id')
+    if sort is not None:
+        names.update(column.key for column in CURSOR_SORTS[sort][0])
+    return tuple(column for name, column in PRODUCT_FIELDS.items() if name in names)
+
+def _facet_state(product):
+    """The fields of a product that category facets depend on
+    
+    NULL stock counts as out of stock, like the facets' CASE WHEN stock > 0.
+    """
+    return product.category, product.price, (product.stock or 0) > 0
+
+def _stock_crossed_zero(stock, change):
+    """True if a stock change that left `stock` moved the product in or out of stock"""
+    if stock is None:
+        # NULL stock stays NULL (and out of stock) under stock + change
+        return False
+    return (stock > 0) != (stock - change > 0)
+
+def _cursor_page(query, cursor, sort, per_page, include_total):
+    """Fetch one keyset page; deep pages cost the same as the first one"""
+    columns, descending = CURSOR_SORTS[sort]
+    after = decode_cursor(cursor)
+    
+    total = query.order_by(None).count() if include_total else None
+    
+    if after is not None:
+        if (not isinstance(after, list) or len(after) != len(columns)
+                or not all(isinstance(value, (int, float)) for value in after)):
+            raise InvalidCursor('Invalid cursor')
+        key = tuple_(*columns)
+        query = query.filter(key < tuple_(*after) if descending else key > tuple_(*after))
+    
+    order = [column.desc() if descending else column.asc() for column in columns]
+    rows = query.order_by(*order).limit(per_page + 1).all()
+    
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    next_cursor = None
+    if has_more:
+        last = rows[-1]
+        next_cursor = encode_cursor([getattr(last, column.key) for column in columns])
+    
+    return rows, next_cursor, total
+
 @products_bp.route('/', methods=['GET'])
 def get_products():
     """Get all products with optional filters"""
@@ -17,17 +113,62 @@ def get_products():
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
         
-        # Build query
-        query = Product.query
+        # Cursor mode is selected by passing `cursor` (empty for the first page)
+        cursor = request.args.get('cursor')
+        sort = request.args.get('sort', 'id')
+        include_total = request.args.get('include_total', 'false').lower() == 'true'
+        
+        if cursor is not None and sort not in CURSOR_SORTS:
+            return jsonify({
+                'success': False,
+                'message': f'Invalid sort. Must be one of: {", ".join(CURSOR_SORTS)}'
+            }), 400
+        
+        # Only the requested columns are selected (grid views skip description)
+        fields = request.args.get('fields')
+        try:
+            columns = _listing_columns(fields, sort if cursor is not None else None)
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+        
+        # Revalidation against the catalogue version, before any listing work.
+        # The version is part of the cache key too: a page loaded before a
+        # write can then never be cached, or served, under the newer ETag.
+        version, last_modified = _catalogue_version()
+        cache_key = cache.listing_key({
+            'version': version,
+            'search': search.strip().lower(),
+            'category': category,
+            'minPrice': min_price,
+            'maxPrice': max_price,
+            'page': page,
+            'per_page': per_page,
+            'cursor': cursor,
+            'sort': sort if cursor is not None else None,
+            'include_total': include_total if cursor is not None else None,
+            'fields': [column.key for column in columns] if fields is not None else None
+        })
+        etag = make_etag(version, cache_key)
+        response = not_modified(etag, last_modified)
+        if response is not None:
+            return response
+        headers = validator_headers(etag, last_modified)
+        
+        # Serve from cache when the same normalized filters were seen recently
+        cached = cache.get_listing(cache_key)
+        if cached is not None:
+            return jsonify(cached), 200, headers
+        
+        # Build query (plain rows, no ORM instances)
+        query = Product.query.with_entities(*columns)
         
         # Apply filters
+        rank = None
         if search:
-            query = query.filter(
-                or_(
-                    Product.name.ilike(f'%{search}%'),
-                    Product.description.ilike(f'%{search}%')
-                )
-            )
+            query, rank = apply_search(query, search)
         
         if category:
             query = query.filter(Product.category == category)
@@ -38,20 +179,47 @@ def get_products():
         if max_price is not None:
             query = query.filter(Product.price <= max_price)
         
-        # Paginate
-        pagination = query.paginate(page=page, per_page=per_page, error_out=False)
-        
-        products = [product.to_dict() for product in pagination.items]
-        
-        return jsonify({
-            'success': True,
-            'products': products,
-            'total': pagination.total,
-            'page': page,
-            'per_page': per_page,
-            'pages': pagination.pages
-        }), 200
-        
+        if cursor is not None:
+            try:
+                rows, next_cursor, total = _cursor_page(query, cursor, sort, per_page, include_total)
+            except InvalidCursor as e:
+                return jsonify({
+                    'success': False,
+                    'message': str(e)
+                }), 400
+            
+            payload = {
+                'success': True,
+                'products': [row._asdict() for row in rows],
+                'per_page': per_page,
+                'sort': sort,
+                'next_cursor': next_cursor
+            }
+            if include_total:
+                payload['total'] = total
+        else:
+            # Best matches first when searching
+            if rank is not None:
+                query = query.order_by(rank, Product.id)
+            
+            # Paginate
+            pagination = query.paginate(page=page, per_page=per_page, error_out=False)
+            
+            products = [row._asdict() for row in pagination.items]
+            
+            payload = {
+                'success': True,
+                'products': products,
+                'total': pagination.total,
+                'page': page,
+                'per_page': per_page,
+                'pages': pagination.pages
+            }
+        
+        cache.set_listing(cache_key, payload)
+        
+        return jsonify(payload), 200, headers
+    
     except Exception as e:
         return jsonify({
             'success': False,
@@ -62,19 +230,89 @@ def get_products():
 def get_product(product_id):
     """Get product by ID"""
     try:
-        product = Product.query.get(product_id)
+        product_data = cache.get_product(product_id)
+        if product_data is None:
+            # Read before the load: set_products skips the dict if a write lands in between
+            version = cache.get_catalogue_version()
+            product = Product.query.get(product_id)
+            
+            if not product:
+                return jsonify({
+                    'success': False,
+                    'message': 'Product not found'
+                }), 404
+            
+            product_data = product.to_dict()
+            cache.set_products([product_data], version)
+        
+        # updated_at moves on every write to the row
+        etag = make_etag(product_id, product_data['updated_at'])
+        last_modified = parse_timestamp(product_data['updated_at'])
+        response = not_modified(etag, last_modified)
+        if response is not None:
+            return response
         
-        if not product:
+        return jsonify({
+            'success': True,
+            'product': product_data
+        }), 200, validator_headers(etag, last_modified)
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+@products_bp.route('/batch', methods=['GET'])
+def get_products_batch():
+    """Get many products by ID in a single query"""
+    try:
+        raw_ids = request.args.get('ids', '')
+        
+        try:
+            product_ids = list(dict.fromkeys(
+                int(value) for value in raw_ids.split(',') if value.strip()
+            ))
+        except ValueError:
             return jsonify({
                 'success': False,
-                'message': 'Product not found'
-            }), 404
+                'message': 'ids must be a comma-separated list of integers'
+            }), 400
+        
+        if not product_ids:
+            return jsonify({
+                'success': False,
+                'message': 'ids query parameter is required'
+            }), 400
+        
+        max_ids = current_app.config['PRODUCTS_BATCH_MAX_IDS']
+        if len(product_ids) > max_ids:
+            return jsonify({
+                'success': False,
+                'message': f'Too many ids (max {max_ids})'
+            }), 400
+        
+        # Cached products first, then one query for the rest
+        found = cache.get_products(product_ids)
+        missing_ids = [pid for pid in product_ids if pid not in found]
+        
+        if missing_ids:
+            version = cache.get_catalogue_version()
+            # Same shape as to_dict(): these dicts go into the product cache
+            loaded = [
+                Product.row_to_dict(row)
+                for row in Product.query.with_entities(*Product.dict_columns())
+                .filter(Product.id.in_(missing_ids))
+            ]
+            cache.set_products(loaded, version)
+            found.update((product['id'], product) for product in loaded)
         
         return jsonify({
             'success': True,
-            'product': product.to_dict()
+            'products': [found[pid] for pid in product_ids if pid in found],
+            'missing': [pid for pid in product_ids if pid not in found]
         }), 200
-        
+    
     except Exception as e:
         return jsonify({
             'success': False,
@@ -107,14 +345,16 @@ def create_product():
         )
         
         db.session.add(product)
+        refresh_category_facets([product.category])
         db.session.commit()
+        cache.invalidate_products([product.id])
         
         return jsonify({
             'success': True,
             'message': 'Product created successfully',
             'product': product.to_dict()
         }), 201
-        
+    
     except Exception as e:
         db.session.rollback()
         return jsonify({
@@ -135,6 +375,8 @@ def update_product(product_id):
             }), 404
         
         data = request.get_json()
+        # What the category facets depend on, before the update
+        previous = _facet_state(product)
         
         # Update fields
         if 'name' in data:
@@ -150,14 +392,18 @@ def update_product(product_id):
         if 'image' in data:
             product.image = data['image']
         
+        # Name, description and image edits leave the facets alone
+        if _facet_state(product) != previous:
+            refresh_category_facets([previous[0], product.category])
         db.session.commit()
+        cache.invalidate_products([product_id])
         
         return jsonify({
             'success': True,
             'message': 'Product updated successfully',
             'product': product.to_dict()
         }), 200
-        
+    
     except Exception as e:
         db.session.rollback()
         return jsonify({
@@ -178,13 +424,15 @@ def delete_product(product_id):
             }), 404
         
         db.session.delete(product)
+        refresh_category_facets([product.category])
         db.session.commit()
+        cache.invalidate_products([product_id])
         
         return jsonify({
             'success': True,
             'message': 'Product deleted successfully'
         }), 200
-        
+    
     except Exception as e:
         db.session.rollback()
         return jsonify({
@@ -196,32 +444,209 @@ def delete_product(product_id):
 def update_stock(product_id):
     """Update product stock (for order service)"""
     try:
-        product = Product.query.get(product_id)
-        
-        if not product:
-            return jsonify({
-                'success': False,
-                'message': 'Product not found'
-            }), 404
-        
         data = request.get_json()
         quantity = data.get('quantity', 0)
         
-        if product.stock < quantity:
+        # Conditional decrement: the row is only touched if enough stock is left
+        row = db.session.execute(
+            update(Product)
+            .where(Product.id == product_id, Product.stock >= quantity)
+            .values(stock=Product.stock - quantity)
+            .returning(Product.stock, Product.category)
+        ).first()
+        
+        if row is None:
+            db.session.rollback()
+            if not db.session.get(Product, product_id):
+                return jsonify({
+                    'success': False,
+                    'message': 'Product not found'
+                }), 404
             return jsonify({
                 'success': False,
                 'message': 'Insufficient stock'
             }), 400
         
-        product.stock -= quantity
+        if _stock_crossed_zero(row.stock, -quantity):
+            refresh_category_facets([row.category])
         db.session.commit()
+        cache.invalidate_products([product_id])
         
         return jsonify({
             'success': True,
             'message': 'Stock updated successfully',
-            'remaining_stock': product.stock
+            'remaining_stock': row.stock
+        }), 200
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+def _parse_stock_items(data):
+    """Aggregate order lines into {product_id: quantity}, sorted by product ID
+    so concurrent reservations always lock rows in the same order."""
+    if not data or not data.get('items'):
+        raise ValueError('Stock items are required')
+    
+    quantities = {}
+    for item in data['items']:
+        try:
+            product_id = int(item['product_id'])
+            quantity = int(item.get('quantity', 1))
+        except (KeyError, TypeError, ValueError):
+            raise ValueError('Each item needs an integer product_id and quantity')
+        if quantity <= 0:
+            raise ValueError(f'Invalid quantity for product {product_id}')
+        quantities[product_id] = quantities.get(product_id, 0) + quantity
+    
+    return sorted(quantities.items())
+
+def _claim_reservation(reservation_id, status):
+    """Record a reservation ID with `status`; False if the ID is already known"""
+    stmt = dialect_insert(StockReservation).values(reservation_id=reservation_id, status=status)
+    return db.session.execute(
+        stmt.on_conflict_do_nothing(index_elements=[StockReservation.reservation_id])
+        .returning(StockReservation.reservation_id)
+    ).first() is not None
+
+@products_bp.route('/stock/reserve', methods=['POST'])
+def reserve_stock():
+    """Reserve stock for every line of an order in a single transaction
+    
+    With a `reservation_id` the call is idempotent: retrying a reservation
+    that committed is a no-op, and one that was already released (see
+    release_stock) is refused.
+    """
+    try:
+        try:
+            lines = _parse_stock_items(request.get_json())
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
+        
+        reservation_id = request.get_json().get('reservation_id')
+        if reservation_id and not _claim_reservation(str(reservation_id), 'reserved'):
+            existing = db.session.get(StockReservation, str(reservation_id))
+            db.session.rollback()
+            if existing.status == 'reserved':
+                return jsonify({
+                    'success': True,
+                    'message': 'Stock already reserved'
+                }), 200
+            return jsonify({
+                'success': False,
+                'message': 'Reservation was already released'
+            }), 409
+        
+        # Facets only change when a product sells out
+        sold_out = []
+        for product_id, quantity in lines:
+            row = db.session.execute(
+                update(Product)
+                .where(Product.id == product_id, Product.stock >= quantity)
+                .values(stock=Product.stock - quantity)
+                .returning(Product.stock, Product.category)
+            ).first()
+            
+            if row is None:
+                db.session.rollback()
+                if not db.session.get(Product, product_id):
+                    return jsonify({
+                        'success': False,
+                        'message': f'Product {product_id} not found',
+                        'product_id': product_id
+                    }), 404
+                return jsonify({
+                    'success': False,
+                    'message': f'Insufficient stock for product {product_id}',
+                    'product_id': product_id
+                }), 409
+            if _stock_crossed_zero(row.stock, -quantity):
+                sold_out.append(row.category)
+        
+        refresh_category_facets(sold_out)
+        db.session.commit()
+        cache.invalidate_products([product_id for product_id, _ in lines])
+        
+        return jsonify({
+            'success': True,
+            'message': 'Stock reserved successfully'
         }), 200
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+@products_bp.route('/stock/release', methods=['POST'])
+def release_stock():
+    """Return previously reserved stock (compensation for cancelled orders)"""
+    try:
+        try:
+            lines = _parse_stock_items(request.get_json())
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
         
+        reservation_id = request.get_json().get('reservation_id')
+        if reservation_id:
+            # A release that comes first (the reserve timed out and may never
+            # commit) leaves a tombstone, so that reserve is refused later
+            if _claim_reservation(str(reservation_id), 'released'):
+                db.session.commit()
+                return jsonify({
+                    'success': True,
+                    'message': 'Nothing was reserved',
+                    'released': False
+                }), 200
+            claimed = db.session.execute(
+                update(StockReservation)
+                .where(
+                    StockReservation.reservation_id == str(reservation_id),
+                    StockReservation.status == 'reserved'
+                )
+                .values(status='released')
+                .execution_options(synchronize_session=False)
+            )
+            if claimed.rowcount == 0:
+                db.session.rollback()
+                return jsonify({
+                    'success': True,
+                    'message': 'Stock already released',
+                    'released': False
+                }), 200
+        
+        restocked = []
+        for product_id, quantity in lines:
+            # Products deleted since the reservation are skipped
+            row = db.session.execute(
+                update(Product)
+                .where(Product.id == product_id)
+                .values(stock=Product.stock + quantity)
+                .returning(Product.stock, Product.category)
+            ).first()
+            if row is not None and _stock_crossed_zero(row.stock, quantity):
+                restocked.append(row.category)
+        
+        refresh_category_facets(restocked)
+        db.session.commit()
+        cache.invalidate_products([product_id for product_id, _ in lines])
+        
+        return jsonify({
+            'success': True,
+            'message': 'Stock released successfully',
+            'released': True
+        }), 200
+    
     except Exception as e:
         db.session.rollback()
         return jsonify({
@@ -229,18 +654,126 @@ def update_stock(product_id):
             'message': str(e)
         }), 500
 
+def _bulk_format(default='ndjson'):
+    """Pick ndjson/csv from ?format= or the request content type"""
+    fmt = request.args.get('format')
+    if not fmt:
+        mimetype = request.mimetype or ''
+        fmt = 'csv' if mimetype == 'text/csv' else default
+    return fmt.lower()
+
+@products_bp.route('/import', methods=['POST'])
+def import_products():
+    """Bulk insert/upsert products from an NDJSON or CSV request body
+    
+    The body is read as a stream and written in chunks of
+    PRODUCTS_IMPORT_CHUNK_SIZE rows, one transaction per chunk.
+    """
+    fmt = _bulk_format()
+    if fmt not in BULK_FORMATS:
+        return jsonify({
+            'success': False,
+            'message': f'Invalid format. Must be one of: {", ".join(BULK_FORMATS)}'
+        }), 400
+    
+    progress = {'imported': 0}
+    
+    def on_chunk(product_ids):
+        progress['imported'] += len(product_ids)
+        cache.invalidate_products(product_ids)
+    
+    try:
+        result = bulk.import_products(
+            request.stream, fmt,
+            chunk_size=current_app.config['PRODUCTS_IMPORT_CHUNK_SIZE'],
+            on_chunk=on_chunk
+        )
+        
+        return jsonify({
+            'success': True,
+            'message': f"{result['imported']} product(s) imported",
+            **result
+        }), 200
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': str(e),
+            'imported': progress['imported']
+        }), 500
+    
+    finally:
+        # The facets were rebuilt after the last committed chunk
+        if progress['imported']:
+            cache.invalidate_products()
+
+@products_bp.route('/export', methods=['GET'])
+def export_products():
+    """Stream the catalogue as NDJSON or CSV (chunked response)"""
+    fmt = _bulk_format()
+    if fmt not in BULK_FORMATS:
+        return jsonify({
+            'success': False,
+            'message': f'Invalid format. Must be one of: {", ".join(BULK_FORMATS)}'
+        }), 400
+    
+    rows = bulk.export_products(
+        fmt,
+        category=request.args.get('category'),
+        chunk_size=current_app.config['PRODUCTS_EXPORT_CHUNK_SIZE']
+    )
+    response = Response(stream_with_context(rows), mimetype=BULK_FORMATS[fmt])
+    response.headers['Content-Disposition'] = f'attachment; filename=products.{fmt}'
+    return response
+
 @products_bp.route('/categories', methods=['GET'])
 def get_categories():
     """Get all unique categories"""
     try:
-        categories = db.session.query(Product.category).distinct().all()
-        categories = [cat[0] for cat in categories if cat[0]]
+        version, last_modified = _catalogue_version()
+        etag = make_etag(version, 'categories')
+        response = not_modified(etag, last_modified)
+        if response is not None:
+            return response
+        headers = validator_headers(etag, last_modified)
         
-        return jsonify({
+        cached = cache.get_categories(version)
+        if cached is not None:
+            return jsonify(cached), 200, headers
+        
+        # One row per category in the summary table, no scan of products
+        categories = [facet['category'] for facet in category_facets()]
+        
+        payload = {
             'success': True,
             'categories': categories
-        }), 200
+        }
+        cache.set_categories(payload, version)
+        
+        return jsonify(payload), 200, headers
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 500
+
+@products_bp.route('/facets', methods=['GET'])
+def get_facets():
+    """Get product counts, in-stock counts and price range per category"""
+    try:
+        version, last_modified = _catalogue_version()
+        etag = make_etag(version, 'facets')
+        response = not_modified(etag, last_modified)
+        if response is not None:
+            return response
         
+        return jsonify({
+            'success': True,
+            'facets': category_facets()
+        }), 200, validator_headers(etag, last_modified)
+    
     except Exception as e:
         return jsonify({
             'success': False,
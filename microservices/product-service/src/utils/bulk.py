@@ -0,0 +1,200 @@
+import csv
+import io
+import json
+from datetime import datetime
+from sqlalchemy import insert, select, text
+from models.product import Product
+from utils.database import db, dialect_insert
+from utils.facets import refresh_category_facets
+
+# Columns accepted on import and written on export (search_vector is generated)
+EXPORT_COLUMNS = ['id', 'name', 'description', 'price', 'stock', 'category', 'image', 'created_at', 'updated_at']
+UPSERT_COLUMNS = ['name', 'description', 'price', 'stock', 'category', 'image']
+
+class ImportFormatError(ValueError):
+    """Raised when an import row cannot be turned into a product"""
+
+def parse_rows(stream, fmt):
+    """Yield (line_number, dict) from an NDJSON or CSV byte stream, one line at a time"""
+    reader = io.TextIOWrapper(stream, encoding='utf-8', newline='')
+    if fmt == 'csv':
+        rows = csv.DictReader(reader)
+        for row in rows:
+            yield rows.line_num, row
+        return
+    
+    for line_number, line in enumerate(reader, start=1):
+        if line.strip():
+            yield line_number, line
+
+def _row_values(raw):
+    """Validate one raw row (JSON text or CSV dict) into column values
+    
+    Returns (values, provided): missing fields get their defaults in
+    `values`, for inserts; `provided` names the columns the row actually
+    set, the only ones an upsert overwrites.
+    """
+    try:
+        data = json.loads(raw) if isinstance(raw, str) else raw
+    except ValueError as e:
+        raise ImportFormatError(f'Invalid JSON: {e}')
+    if not isinstance(data, dict):
+        raise ImportFormatError('Row must be an object')
+    
+    if not data.get('name'):
+        raise ImportFormatError('Missing required field: name')
+    if data.get('price') in (None, ''):
+        raise ImportFormatError('Missing required field: price')
+    
+    try:
+        values = {
+            'name': str(data['name']),
+            'description': data.get('description') or '',
+            'price': float(data['price']),
+            'stock': int(data.get('stock') or 0),
+            'category': data.get('category') or '',
+            'image': data.get('image') or ''
+        }
+        if data.get('id') not in (None, ''):
+            values['id'] = int(data['id'])
+    except (TypeError, ValueError) as e:
+        raise ImportFormatError(f'Invalid value: {e}')
+    
+    if values['price'] < 0 or values['stock'] < 0:
+        raise ImportFormatError('price and stock must not be negative')
+    
+    provided = frozenset(column for column in UPSERT_COLUMNS if data.get(column) not in (None, ''))
+    return values, provided
+
+def _upsert_statement(provided):
+    """INSERT ... ON CONFLICT (id) DO UPDATE of the `provided` columns only"""
+    stmt = dialect_insert(Product)
+    updates = {column: stmt.excluded[column] for column in UPSERT_COLUMNS if column in provided}
+    updates['updated_at'] = stmt.excluded.updated_at
+    return stmt.on_conflict_do_update(index_elements=[Product.id], set_=updates)
+
+def _write_chunk(rows):
+    """Insert/upsert one chunk with executemany and commit; return the IDs touched
+    
+    `rows` are (values, provided) pairs from _row_values().
+    """
+    now = datetime.utcnow()
+    for values, _ in rows:
+        values['created_at'] = now
+        values['updated_at'] = now
+    
+    # A row may only be upserted once per statement; the last one wins
+    with_id = list({values['id']: (values, provided) for values, provided in rows if 'id' in values}.values())
+    without_id = [values for values, _ in rows if 'id' not in values]
+    
+    # One executemany per set of provided columns (rows of one file usually share it)
+    by_columns = {}
+    for values, provided in with_id:
+        by_columns.setdefault(provided, []).append(values)
+    
+    product_ids = [values['id'] for values, _ in with_id]
+    for provided, group in by_columns.items():
+        db.session.execute(_upsert_statement(provided), group)
+    if with_id:
+        # Before the id-less inserts, whose nextval could hit an ID just written
+        _sync_id_sequence()
+    if without_id:
+        result = db.session.execute(insert(Product).returning(Product.id), without_id)
+        product_ids.extend(result.scalars().all())
+    db.session.commit()
+    return product_ids
+
+def _sync_id_sequence():
+    """Move the products id sequence past explicitly imported IDs (PostgreSQL)"""
+    if db.engine.dialect.name == 'postgresql':
+        db.session.execute(text(
+            "SELECT setval(pg_get_serial_sequence('products', 'id'), "
+            "GREATEST((SELECT MAX(id) FROM products), 1))"
+        ))
+
+def import_products(stream, fmt, chunk_size=1000, max_errors=100, on_chunk=None):
+    """Stream rows into the products table in chunks of `chunk_size`
+    
+    Rows with an `id` are upserted, rows without one are inserted. Each chunk
+    is one executemany in its own transaction, so memory stays bounded by the
+    chunk size. Invalid rows are skipped and reported (first `max_errors`).
+    `on_chunk(product_ids)` is called after each commit. The category
+    facets are rebuilt once at the end, even if a chunk fails.
+    """
+    imported = 0
+    failed = 0
+    errors = []
+    chunk = []
+    
+    def flush():
+        nonlocal imported
+        product_ids = _write_chunk(chunk)
+        imported += len(product_ids)
+        chunk.clear()
+        if on_chunk is not None:
+            on_chunk(product_ids)
+    
+    try:
+        for line_number, raw in parse_rows(stream, fmt):
+            try:
+                values, provided = _row_values(raw)
+            except ImportFormatError as e:
+                failed += 1
+                if len(errors) < max_errors:
+                    errors.append({'line': line_number, 'error': str(e)})
+                continue
+            
+            chunk.append((values, provided))
+            if len(chunk) >= chunk_size:
+                flush()
+        
+        if chunk:
+            flush()
+    finally:
+        # Also after a failed chunk: the chunks before it are committed
+        if imported:
+            db.session.rollback()
+            # Upserts may move products between categories; one rebuild at the end
+            refresh_category_facets()
+            db.session.commit()
+    
+    return {'imported': imported, 'failed': failed, 'errors': errors}
+
+def _export_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+def export_products(fmt, category=None, chunk_size=1000):
+    """Yield the catalogue as NDJSON lines or CSV text, `chunk_size` rows at a time
+    
+    Rows come from a server-side cursor (`yield_per`), so neither the
+    database driver nor the worker holds more than one chunk in memory.
+    """
+    columns = [getattr(Product, name) for name in EXPORT_COLUMNS]
+    query = select(*columns).order_by(Product.id)
+    if category:
+        query = query.filter(Product.category == category)
+    
+    result = db.session.execute(query.execution_options(yield_per=chunk_size))
+    
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if fmt == 'csv' else None
+    if writer is not None:
+        writer.writerow(EXPORT_COLUMNS)
+    
+    for partition in result.partitions():
+        for row in partition:
+            if writer is not None:
+                writer.writerow([_export_value(value) for value in row])
+            else:
+                buffer.write(json.dumps(
+                    {name: _export_value(value) for name, value in zip(EXPORT_COLUMNS, row)}
+                ))
+                buffer.write('\n')
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    
+    if buffer.tell():
+        yield buffer.getvalue()
@@ -0,0 +1,379 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import redis
+from flask import current_app
+from utils.local_cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+cache_client = None
+
+# In-process tier in front of Redis (one per worker process)
+product_cache = None
+categories_cache = None
+version_cache = None
+
+# Write routes publish here so every worker drops its local copies
+_pubsub_client = None
+_invalidation_channel = None
+_subscriber_pid = None
+_subscriber_lock = threading.Lock()
+
+# Longest wait, in seconds, between reconnect attempts of the listener
+LISTENER_MAX_BACKOFF = 30
+
+# Bumped by every local eviction; a fill started before one is dropped
+_local_generation = 0
+_local_lock = threading.Lock()
+
+# After a Redis error, skip the cache for a short while instead of paying
+# the socket timeout on every request
+_disabled_until = 0
+
+# Product IDs of invalidations that did not reach Redis (None: nothing
+# pending); applied before Redis is used again
+_pending_invalidation = None
+_pending_lock = threading.Lock()
+
+def init_cache(app):
+    """Initialize Redis cache client"""
+    global cache_client, product_cache, categories_cache, version_cache, _pubsub_client, _invalidation_channel
+    
+    if app.config['LOCAL_CACHE_ENABLED']:
+        product_cache = LRUCache(
+            'products',
+            max_size=app.config['LOCAL_CACHE_MAX_SIZE'],
+            ttl=app.config['LOCAL_CACHE_TTL']
+        )
+        categories_cache = LRUCache('categories', max_size=1, ttl=app.config['LOCAL_CACHE_TTL'])
+        version_cache = LRUCache('version', max_size=1, ttl=app.config['LOCAL_CACHE_TTL'])
+    else:
+        product_cache = None
+        categories_cache = None
+        version_cache = None
+    
+    if not app.config['CACHE_ENABLED']:
+        cache_client = None
+        _pubsub_client = None
+        return
+    
+    connection_kwargs = {
+        'host': app.config['REDIS_HOST'],
+        'port': app.config['REDIS_PORT'],
+        'password': app.config['REDIS_PASSWORD'] or None,
+        'db': app.config['REDIS_DB']
+    }
+    cache_client = redis.Redis(
+        socket_timeout=app.config['CACHE_SOCKET_TIMEOUT'],
+        socket_connect_timeout=app.config['CACHE_SOCKET_TIMEOUT'],
+        **connection_kwargs
+    )
+    # Subscriptions block on reads, so they get their own client without a read timeout
+    _pubsub_client = redis.Redis(health_check_interval=30, **connection_kwargs)
+    _invalidation_channel = app.config['CACHE_KEY_PREFIX'] + 'invalidate'
+
+def _client():
+    if cache_client is None or time.monotonic() < _disabled_until:
+        return None
+    if _pending_invalidation is not None and not _apply_invalidation([]):
+        return None
+    return cache_client
+
+def _on_error(e):
+    global _disabled_until
+    _disabled_until = time.monotonic() + current_app.config['CACHE_ERROR_COOLDOWN']
+    logger.warning("Redis cache unavailable: %s", e)
+
+def _evict_local(product_ids):
+    global _local_generation
+    with _local_lock:
+        _local_generation += 1
+        if product_cache is not None:
+            product_cache.delete(*product_ids)
+        if categories_cache is not None:
+            categories_cache.clear()
+        if version_cache is not None:
+            version_cache.clear()
+
+def _clear_local():
+    global _local_generation
+    with _local_lock:
+        _local_generation += 1
+        if product_cache is not None:
+            product_cache.clear()
+        if categories_cache is not None:
+            categories_cache.clear()
+        if version_cache is not None:
+            version_cache.clear()
+
+def _fill_local(products, generation):
+    """Put product dicts in the local tier unless an eviction ran since `generation`"""
+    if product_cache is None:
+        return
+    with _local_lock:
+        if generation != _local_generation:
+            return
+        for product in products:
+            product_cache.set(product['id'], product)
+
+def _listen_for_invalidations():
+    """Drop local entries whenever any worker publishes an invalidation
+    
+    Reconnects with exponential backoff (1s doubling up to
+    LISTENER_MAX_BACKOFF) while Redis is down.
+    """
+    delay = 1
+    while True:
+        try:
+            pubsub = _pubsub_client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(_invalidation_channel)
+            delay = 1
+            # Messages may have been missed while we were not subscribed
+            _clear_local()
+            for message in pubsub.listen():
+                data = json.loads(message['data'])
+                _evict_local(data.get('product_ids', []))
+        except Exception as e:
+            logger.warning("Cache invalidation listener error, retrying in %ss: %s", delay, e)
+            _clear_local()
+            time.sleep(delay)
+            delay = min(delay * 2, LISTENER_MAX_BACKOFF)
+
+def _ensure_subscriber():
+    """Start the invalidation listener once per worker process (after any fork)"""
+    global _subscriber_pid
+    if product_cache is None or _pubsub_client is None or _subscriber_pid == os.getpid():
+        return
+    with _subscriber_lock:
+        if _subscriber_pid == os.getpid():
+            return
+        _subscriber_pid = os.getpid()
+        threading.Thread(
+            target=_listen_for_invalidations,
+            name='cache-invalidation',
+            daemon=True
+        ).start()
+
+def _key(*parts):
+    return current_app.config['CACHE_KEY_PREFIX'] + ':'.join(str(part) for part in parts)
+
+def _version_key():
+    return _key('products', 'version')
+
+def listing_key(params):
+    """Build a cache key from normalized listing parameters"""
+    normalized = json.dumps(params, sort_keys=True, separators=(',', ':'))
+    digest = hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+    return _key('products', 'list', digest)
+
+def get_product(product_id):
+    """Return the cached product dict or None (worker memory first, then Redis)"""
+    _ensure_subscriber()
+    if product_cache is not None:
+        product = product_cache.get(product_id)
+        if product is not None:
+            return product
+    
+    generation = _local_generation
+    client = _client()
+    if client is None:
+        return None
+    try:
+        payload = client.get(_key('product', product_id))
+        if not payload:
+            return None
+        product = current_app.json.loads(payload)
+        _fill_local([product], generation)
+        return product
+    except redis.RedisError as e:
+        _on_error(e)
+        return None
+
+def get_products(product_ids):
+    """Return {product_id: product dict} for the IDs found in the cache"""
+    _ensure_subscriber()
+    found = {}
+    if product_cache is not None:
+        for pid in product_ids:
+            product = product_cache.get(pid)
+            if product is not None:
+                found[pid] = product
+    
+    remaining = [pid for pid in product_ids if pid not in found]
+    generation = _local_generation
+    client = _client()
+    if client is None or not remaining:
+        return found
+    try:
+        payloads = client.mget([_key('product', pid) for pid in remaining])
+        loaded = [current_app.json.loads(payload) for payload in payloads if payload]
+        _fill_local(loaded, generation)
+        found.update((product['id'], product) for product in loaded)
+        return found
+    except redis.RedisError as e:
+        _on_error(e)
+        return found
+
+def set_products(products, version):
+    """Cache product dicts loaded from the database
+    
+    `version` is get_catalogue_version() read before the load. The dicts are
+    only cached if no write has moved it since: otherwise they may predate
+    that write, and caching them would undo its invalidation for a whole TTL.
+    """
+    if not products:
+        return
+    generation = _local_generation
+    if cache_client is None:
+        # Worker memory only; the local invalidation is all there is
+        _fill_local(products, generation)
+        return
+    
+    client = _client()
+    if client is None or version is None:
+        return
+    ttl = current_app.config['CACHE_PRODUCT_TTL']
+    try:
+        # WATCH makes the check and the SETs atomic against a version bump
+        with client.pipeline() as pipe:
+            pipe.watch(_version_key())
+            current = pipe.get(_version_key())
+            if current is None or int(current) != version:
+                return
+            pipe.multi()
+            for product in products:
+                pipe.set(_key('product', product['id']), current_app.json.dumps(product), ex=ttl)
+            pipe.execute()
+    except redis.WatchError:
+        return
+    except redis.RedisError as e:
+        _on_error(e)
+        return
+    _fill_local(products, generation)
+
+def get_listing(key):
+    """Return a cached listing payload or None"""
+    client = _client()
+    if client is None:
+        return None
+    try:
+        payload = client.get(key)
+        return current_app.json.loads(payload) if payload else None
+    except redis.RedisError as e:
+        _on_error(e)
+        return None
+
+def set_listing(key, payload):
+    """Cache a listing payload (keys carry the catalogue version, see listing_key)"""
+    client = _client()
+    if client is None:
+        return
+    try:
+        client.set(key, current_app.json.dumps(payload), ex=current_app.config['CACHE_LIST_TTL'])
+    except redis.RedisError as e:
+        _on_error(e)
+
+def invalidate_products(product_ids=()):
+    """Drop cached products and start a new catalogue version
+    
+    Listings and categories are keyed by the version, so the bump retires
+    all of them without touching their keys.
+    
+    Called by the write routes after their transaction commits. Other workers
+    drop their in-process copies when they receive the published message.
+    """
+    product_ids = list(product_ids)
+    _evict_local(product_ids)
+    
+    # Tried even during the error cooldown: a lost invalidation would serve
+    # stale products and listings (under an unchanged ETag) for a whole TTL
+    if cache_client is not None:
+        _apply_invalidation(product_ids)
+
+def _apply_invalidation(product_ids):
+    """Run an invalidation (plus any pending one) against Redis
+    
+    On failure the product IDs are kept as pending and False is returned.
+    """
+    global _pending_invalidation
+    with _pending_lock:
+        product_ids = sorted(set(product_ids) | (_pending_invalidation or set()))
+        _pending_invalidation = None
+    
+    client = cache_client
+    try:
+        pipe = client.pipeline(transaction=False)
+        # Bump first: a set_products() that read the old version fails from here on
+        pipe.set(_version_key(), time.time_ns())
+        if product_ids:
+            pipe.delete(*[_key('product', pid) for pid in product_ids])
+        pipe.publish(_invalidation_channel, json.dumps({'product_ids': product_ids}))
+        pipe.execute()
+        return True
+    except redis.RedisError as e:
+        with _pending_lock:
+            _pending_invalidation = (_pending_invalidation or set()) | set(product_ids)
+        _on_error(e)
+        return False
+
+def get_categories(version):
+    """Return the cached categories payload of a catalogue version or None"""
+    _ensure_subscriber()
+    if categories_cache is not None:
+        payload = categories_cache.get(version)
+        if payload is not None:
+            return payload
+    
+    payload = get_listing(_key('products', 'categories', version))
+    if payload is not None and categories_cache is not None:
+        categories_cache.set(version, payload)
+    return payload
+
+def set_categories(payload, version):
+    """Cache the categories payload of a catalogue version in worker memory and Redis"""
+    if categories_cache is not None:
+        categories_cache.set(version, payload)
+    set_listing(_key('products', 'categories', version), payload)
+
+def get_catalogue_version():
+    """Return the catalogue version, or None without Redis
+    
+    The version is the time (ns) of the last write, set by
+    invalidate_products(). A missing key (first start, flushed Redis) starts
+    a new version rather than reusing an old one.
+    """
+    _ensure_subscriber()
+    if version_cache is not None:
+        version = version_cache.get('version')
+        if version is not None:
+            return version
+    
+    client = _client()
+    if client is None:
+        return None
+    try:
+        pipe = client.pipeline(transaction=False)
+        pipe.set(_version_key(), time.time_ns(), nx=True)
+        pipe.get(_version_key())
+        version = int(pipe.execute()[1])
+    except redis.RedisError as e:
+        _on_error(e)
+        return None
+    
+    if version_cache is not None:
+        version_cache.set('version', version)
+    return version
+
+def cache_stats():
+    """Hit/miss counters of the in-process tier"""
+    return {
+        'redis_enabled': cache_client is not None,
+        'local': [
+            local.stats() for local in (product_cache, categories_cache, version_cache)
+            if local is not None
+        ]
+    }
@@ -0,0 +1,45 @@
+import hashlib
+import re
+from datetime import datetime, timezone
+from flask import Response, current_app, request
+from werkzeug.http import http_date, is_resource_modified
+
+# Flask-Compress tags compressed bodies as W/"<etag>:<algorithm>"
+_ENCODING_SUFFIX = re.compile(r':(?:br|gzip|deflate)"')
+
+def make_etag(*parts):
+    """Weak entity tag from the values that determine a response body"""
+    digest = hashlib.sha1(':'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+    return f'W/"{digest[:32]}"'
+
+def validator_headers(etag, last_modified=None):
+    """ETag, Last-Modified and Cache-Control headers for a cacheable response"""
+    headers = {
+        'ETag': etag,
+        'Cache-Control': current_app.config['HTTP_CACHE_CONTROL']
+    }
+    if last_modified is not None:
+        headers['Last-Modified'] = http_date(last_modified)
+    return headers
+
+def not_modified(etag, last_modified=None):
+    """Return a 304 response if the client's copy is still current, else None
+    
+    Checked before the body is loaded or serialized. If-None-Match wins over
+    If-Modified-Since, which only has one-second resolution.
+    """
+    environ = request.environ
+    if_none_match = environ.get('HTTP_IF_NONE_MATCH')
+    if if_none_match:
+        environ = dict(environ, HTTP_IF_NONE_MATCH=_ENCODING_SUFFIX.sub('"', if_none_match))
+    if is_resource_modified(environ, etag=etag, last_modified=last_modified):
+        return None
+    return Response(status=304, headers=validator_headers(etag, last_modified))
+
+def parse_timestamp(value):
+    """datetime of an ISO string from to_dict() (naive UTC), or None"""
+    return datetime.fromisoformat(value) if value else None
+
+def from_version(version):
+    """Last-Modified of a catalogue version (nanoseconds since the epoch)"""
+    return datetime.fromtimestamp(version / 1e9, tz=timezone.utc)
@@ -1,23 +1,112 @@
 from flask_sqlalchemy import SQLAlchemy
+from flask_migrate import Migrate
+from sqlalchemy import event
+from sqlalchemy import inspect
+from sqlalchemy import insert
+from sqlalchemy import text
+import os
 
 db = SQLAlchemy()
+migrate = Migrate()
+
+# Pool usage counters of this worker process (see pool_stats)
+_pool_counters = {'checkouts': 0, 'peak_checked_out': 0}
+
+# Schema changes are managed by Alembic migrations (flask db upgrade)
+MIGRATIONS_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))),
+    'migrations'
+)
+
+def configure_engine(app):
+    """Attach pool metrics and pooler-specific connection settings"""
+    engine = db.engine
+    
+    @event.listens_for(engine, 'checkout')
+    def track_checkout(dbapi_connection, connection_record, connection_proxy):
+        _pool_counters['checkouts'] += 1
+        checked_out = getattr(engine.pool, 'checkedout', lambda: 0)()
+        if checked_out > _pool_counters['peak_checked_out']:
+            _pool_counters['peak_checked_out'] = checked_out
+    
+    # Behind a transaction-mode pooler session settings do not stick,
+    # so the statement timeout is set at the start of every transaction
+    timeout = app.config['DB_STATEMENT_TIMEOUT_MS']
+    if app.config['DB_POOL_MODE'] == 'pgbouncer' and timeout and engine.dialect.name == 'postgresql':
+        @event.listens_for(engine, 'begin')
+        def set_statement_timeout(connection):
+            connection.exec_driver_sql(f'SET LOCAL statement_timeout = {int(timeout)}')
+
+def dialect_insert(model):
+    """INSERT construct of the current dialect, for ON CONFLICT upserts"""
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as upsert_insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as upsert_insert
+    else:
+        raise RuntimeError(f'Upserts are not supported on {dialect}')
+    return upsert_insert(model)
+
+def pool_stats():
+    """Connection pool saturation for this worker process"""
+    pool = db.engine.pool
+    stats = {
+        'pool_class': type(pool).__name__,
+        'checkouts': _pool_counters['checkouts'],
+        'peak_checked_out': _pool_counters['peak_checked_out']
+    }
+    if hasattr(pool, 'checkedout'):
+        capacity = pool.size() + max(pool._max_overflow, 0)
+        stats.update({
+            'size': pool.size(),
+            'max_overflow': pool._max_overflow,
+            'checked_out': pool.checkedout(),
+            'checked_in': pool.checkedin(),
+            'overflow': pool.overflow(),
+            'saturation': round(pool.checkedout() / capacity, 4) if capacity else 0.0
+        })
+    return stats
 
 def init_db(app):
     """Initialize database"""
     db.init_app(app)
+    migrate.init_app(app, db, directory=MIGRATIONS_DIR)
     
     with app.app_context():
-        # Create tables
-        db.create_all()
+        configure_engine(app)
+        
+        # Tests build the schema straight from the models; every other
+        # environment runs `flask --app src/app db upgrade` before starting
+        if app.config['DB_AUTO_CREATE']:
+            db.create_all()
         
-        # Seed initial data if empty
+        # Tests seed in-process; other environments run `flask seed` once before
+        # the workers start, so seeding never races between workers
         from models.product import Product
-        if Product.query.count() == 0:
+        if not inspect(db.engine).has_table(Product.__tablename__):
+            print("⚠️  Table 'products' missing, run `flask --app src/app db upgrade`")
+        elif app.config['DB_AUTO_CREATE']:
             seed_products()
+    
+    @app.cli.command('seed')
+    def seed_command():
+        """Seed sample products if the catalogue is empty"""
+        if not seed_products():
+            print("ℹ️  Products already present, nothing seeded")
 
 def seed_products():
-    """Seed initial products for testing"""
+    """Seed initial products for testing if the table is empty; return True if seeded"""
     from models.product import Product
+    from utils.facets import refresh_category_facets
+    
+    # Concurrent seeders (several containers starting at once) wait here and
+    # then see the rows of the first one
+    if db.engine.dialect.name == 'postgresql':
+        db.session.execute(text("SELECT pg_advisory_xact_lock(hashtext('seed_products'))"))
+    if db.session.query(Product.id).first() is not None:
+        db.session.rollback()
+        return False
     
     sample_products = [
         {
@@ -86,9 +175,9 @@ def seed_products():
         },
     ]
     
-    for product_data in sample_products:
-        product = Product(**product_data)
-        db.session.add(product)
-    
+    # One multi-row INSERT instead of one ORM flush per product
+    db.session.execute(insert(Product), sample_products)
+    refresh_category_facets()
     db.session.commit()
     print("✅ Seeded initial products")
+    return True
@@ -0,0 +1,84 @@
+from datetime import datetime
+from sqlalchemy import case, delete, exists, func, literal, select, text
+from models.category_facet import CategoryFacet
+from models.product import Product
+from utils.database import db, dialect_insert
+
+FACET_COLUMNS = ['category', 'product_count', 'in_stock_count', 'min_price', 'max_price', 'updated_at']
+
+def _aggregate(categories):
+    """SELECT of the facet rows of `categories` (None: every category)"""
+    query = (
+        select(
+            Product.category,
+            func.count(Product.id),
+            func.coalesce(func.sum(case((Product.stock > 0, 1), else_=0)), 0),
+            func.min(Product.price),
+            func.max(Product.price),
+            literal(datetime.utcnow(), db.DateTime)
+        )
+        .where(Product.category.isnot(None), Product.category != '')
+        .group_by(Product.category)
+    )
+    if categories is not None:
+        query = query.where(Product.category.in_(categories))
+    return query
+
+def _lock(categories):
+    """Serialize refreshes (PostgreSQL) so the last one sees every earlier commit"""
+    if db.engine.dialect.name != 'postgresql':
+        return
+    if categories is None:
+        db.session.execute(text('LOCK TABLE category_facets IN EXCLUSIVE MODE'))
+        return
+    # Sorted, so concurrent writers always lock categories in the same order
+    for category in categories:
+        db.session.execute(
+            text('SELECT pg_advisory_xact_lock(hashtext(:key))'),
+            {'key': f'category_facets:{category}'}
+        )
+
+def refresh_category_facets(categories=None):
+    """Recompute the summary rows of `categories` from products
+    
+    Call it in the write's transaction, after the product changes, so the
+    summary commits with them. Each category is one GROUP BY over its
+    ix_products_category_price range; None rebuilds every category (seed,
+    bulk import). Categories left without products are removed.
+    """
+    if categories is not None:
+        categories = sorted({category for category in categories if category})
+        if not categories:
+            return
+    
+    db.session.flush()
+    _lock(categories)
+    
+    stmt = dialect_insert(CategoryFacet).from_select(FACET_COLUMNS, _aggregate(categories))
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[CategoryFacet.category],
+        set_={column: stmt.excluded[column] for column in FACET_COLUMNS[1:]}
+    )
+    db.session.execute(stmt)
+    
+    emptied = delete(CategoryFacet).where(
+        ~exists().where(Product.category == CategoryFacet.category)
+    )
+    if categories is not None:
+        emptied = emptied.where(CategoryFacet.category.in_(categories))
+    db.session.execute(emptied)
+
+def category_facets():
+    """Facet dicts of every category, by name (one read of the summary table)"""
+    return [
+        row._asdict()
+        for row in db.session.execute(
+            select(
+                CategoryFacet.category,
+                CategoryFacet.product_count,
+                CategoryFacet.in_stock_count,
+                CategoryFacet.min_price,
+                CategoryFacet.max_price
+            ).order_by(CategoryFacet.category)
+        )
+    ]
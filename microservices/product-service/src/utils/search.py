@@ -0,0 +1,36 @@
+import re
+from sqlalchemy import and_, case, func, literal_column, or_
+from utils.database import db
+
+def _tokens(term):
+    return re.findall(r'\w+', term.lower())
+
+def apply_search(query, term):
+    """Filter a Product query by search term
+    
+    Returns (query, rank) where rank is an expression to order by (best match
+    first). PostgreSQL uses the GIN-indexed tsvector column created by the
+    migrations, with prefix matching on every word; other databases (SQLite
+    in tests) fall back to LIKE.
+    """
+    from models.product import Product
+    
+    tokens = _tokens(term)
+    if not tokens:
+        return query, None
+    
+    if db.engine.dialect.name == 'postgresql':
+        search_vector = literal_column('products.search_vector')
+        ts_query = func.to_tsquery('simple', ' & '.join(f'{token}:*' for token in tokens))
+        query = query.filter(search_vector.op('@@')(ts_query))
+        return query, func.ts_rank(search_vector, ts_query).desc()
+    
+    query = query.filter(and_(*[
+        or_(
+            Product.name.ilike(f'%{token}%'),
+            Product.description.ilike(f'%{token}%')
+        )
+        for token in tokens
+    ]))
+    rank = case((Product.name.ilike(f'%{tokens[0]}%'), 0), else_=1)
+    return query, rank
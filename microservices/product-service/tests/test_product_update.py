@@ -0,0 +1,23 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+os.environ['FLASK_ENV'] = 'testing'
+
+from app import create_app
+
+
+@pytest.fixture
+def client():
+    return create_app().test_client()
+
+
+def test_update_with_null_stock(client):
+    response = client.put('/api/products/1', json={'stock': None})
+    assert response.status_code == 200
+    assert response.json['product']['stock'] is None
+
+    # Facets count NULL stock as out of stock
+    assert client.put('/api/products/1', json={'stock': 3}).status_code == 200
@@ -0,0 +1,32 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+os.environ['FLASK_ENV'] = 'testing'
+
+from app import create_app
+from utils import cache
+
+
+@pytest.fixture
+def client():
+    app = create_app()
+    # The worker-local product cache is what /batch and GET /<id> share
+    app.config['LOCAL_CACHE_ENABLED'] = True
+    cache.init_cache(app)
+    return app.test_client()
+
+
+def test_batch_then_get_product(client):
+    batch = client.get('/api/products/batch?ids=1,2')
+    assert batch.status_code == 200
+    assert isinstance(batch.json['products'][0]['updated_at'], str)
+
+    response = client.get('/api/products/1')
+    assert response.status_code == 200
+    assert response.json['product'] == batch.json['products'][0]
+
+    etag = response.headers['ETag']
+    assert client.get('/api/products/1', headers={'If-None-Match': etag}).status_code == 304
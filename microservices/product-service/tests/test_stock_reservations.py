@@ -0,0 +1,63 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src'))
+os.environ['FLASK_ENV'] = 'testing'
+
+from app import create_app
+
+LINES = [{'product_id': 1, 'quantity': 2}]
+
+
+@pytest.fixture
+def client():
+    return create_app().test_client()
+
+
+def stock(client):
+    return client.get('/api/products/1').json['product']['stock']
+
+
+def reserve(client, reservation_id):
+    return client.post('/api/products/stock/reserve', json={'items': LINES, 'reservation_id': reservation_id})
+
+
+def release(client, reservation_id):
+    return client.post('/api/products/stock/release', json={'items': LINES, 'reservation_id': reservation_id})
+
+
+def test_duplicate_reserve_is_applied_once(client):
+    before = stock(client)
+
+    assert reserve(client, 'order-1').status_code == 200
+    response = reserve(client, 'order-1')
+
+    assert response.status_code == 200
+    assert response.json['message'] == 'Stock already reserved'
+    assert stock(client) == before - 2
+
+
+def test_release_before_reserve_blocks_the_late_reserve(client):
+    before = stock(client)
+
+    response = release(client, 'order-2')
+    assert response.status_code == 200
+    assert response.json['released'] is False
+
+    assert reserve(client, 'order-2').status_code == 409
+    assert stock(client) == before
+
+
+def test_double_release_gives_stock_back_once(client):
+    before = stock(client)
+    reserve(client, 'order-3')
+
+    first = release(client, 'order-3')
+    second = release(client, 'order-3')
+
+    assert first.json['released'] is True
+    assert second.status_code == 200
+    assert second.json['released'] is False
+    assert stock(client) == before